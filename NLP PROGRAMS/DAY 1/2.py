@@ -1,5 +1,158 @@
 # FSA for strings over {a,b} that end with 'ab'
+import random
+import sys
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Finite automata as integer tables
+# -----------------------------
+# States are 0..n-1 and symbols map to columns 0..k-1. Column k is "any other
+# character", which every DFA sends to a dead state, so unknown input rejects
+# the same way the hand-written checks below do.
+class DFA:
+    def __init__(self, alphabet: str, table: np.ndarray, start: int, accepting: Iterable[int]):
+        self.alphabet = alphabet
+        self.table = np.asarray(table, dtype=np.int32)          # (n_states, len(alphabet) + 1)
+        self.start = start
+        self.accepting = np.zeros(len(self.table), dtype=bool)
+        self.accepting[list(accepting)] = True
+        self.column = {ch: i for i, ch in enumerate(alphabet)}
+        self.other = len(alphabet)
+        self._rows = self.table.tolist()                        # list indexing beats numpy scalars per char
+        self._lut: Optional[np.ndarray] = None
+
+    @property
+    def n_states(self) -> int:
+        return len(self.table)
+
+    def accepts(self, s: str) -> bool:
+        rows, column, other = self._rows, self.column, self.other
+        state = self.start
+        for ch in s:
+            state = rows[state][column.get(ch, other)]
+        return bool(self.accepting[state])
+
+    def accepts_many(self, strings: Sequence[str], chunk: int = 1 << 20) -> np.ndarray:
+        """accepts() for every string, stepping all of them one character at a time with NumPy."""
+        out = np.empty(len(strings), dtype=bool)
+        for i in range(0, len(strings), chunk):
+            out[i:i + chunk] = self._accepts_chunk(strings[i:i + chunk])
+        return out
+
+    def _accepts_chunk(self, strings: Sequence[str]) -> np.ndarray:
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        codes = np.frombuffer("".join(strings).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        cols = self._symbol_lut()[codes]
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        # Longest first, so the strings still running at step t are always a prefix
+        order = np.argsort(-lengths, kind="stable")
+        lengths, starts = lengths[order], starts[order]
+        states = np.full(len(strings), self.start, dtype=np.int32)
+        running = len(strings)
+        for t in range(int(lengths[0]) if len(lengths) else 0):
+            while lengths[running - 1] <= t:
+                running -= 1
+            states[:running] = self.table[states[:running], cols[starts[:running] + t]]
+
+        result = np.empty(len(strings), dtype=bool)
+        result[order] = self.accepting[states]
+        return result
+
+    def _symbol_lut(self) -> np.ndarray:
+        if self._lut is None:
+            lut = np.full(sys.maxunicode + 1, self.other, dtype=np.int32)
+            for ch, col in self.column.items():
+                lut[ord(ch)] = col
+            self._lut = lut
+        return self._lut
+
+    def minimize(self) -> "DFA":
+        """Drop unreachable states, then merge equivalent ones (Moore partition refinement)."""
+        reachable = {self.start}
+        frontier = [self.start]
+        while frontier:
+            for nxt in self._rows[frontier.pop()]:
+                if nxt not in reachable:
+                    reachable.add(nxt)
+                    frontier.append(nxt)
+        keep = np.array(sorted(reachable))
+        renumber = np.full(self.n_states, -1, dtype=np.int32)
+        renumber[keep] = np.arange(len(keep))
+        table = renumber[self.table[keep]]
+        accepting = self.accepting[keep]
+
+        classes = accepting.astype(np.int64)
+        while True:
+            signature = np.column_stack([classes, classes[table]])
+            _, refined = np.unique(signature, axis=0, return_inverse=True)
+            refined = refined.ravel()
+            if refined.max() == classes.max():
+                break
+            classes = refined
+        # Renumber classes so the start state stays 0-based and first-seen order is stable
+        start = renumber[self.start]
+        _, first = np.unique(classes, return_index=True)
+        n = len(first)
+        merged = np.empty((n, table.shape[1]), dtype=np.int32)
+        merged[classes[first]] = classes[table[first]]
+        return DFA(self.alphabet, merged, int(classes[start]),
+                   np.unique(classes[accepting]).tolist())
+
+class NFA:
+    """
+    transitions[(state, symbol)] = set of next states; symbol None is an epsilon move.
+    Compiled to a DFA by subset construction.
+    """
+    def __init__(self, alphabet: str, transitions: Dict[Tuple[int, Optional[str]], Set[int]],
+                 start: int, accepting: Iterable[int]):
+        self.alphabet = alphabet
+        self.transitions = transitions
+        self.start = start
+        self.accepting = set(accepting)
+
+    def _closure(self, states: Iterable[int]) -> FrozenSet[int]:
+        seen = set(states)
+        stack = list(seen)
+        while stack:
+            for nxt in self.transitions.get((stack.pop(), None), ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return frozenset(seen)
+
+    def to_dfa(self) -> DFA:
+        dead = frozenset()
+        start = self._closure([self.start])
+        index: Dict[FrozenSet[int], int] = {dead: 0, start: 1}
+        pending = [start]
+        rows: List[List[int]] = [[0] * (len(self.alphabet) + 1)]   # state 0 is the dead state
+        rows.append(None)
+        while pending:
+            subset = pending.pop()
+            row = []
+            for symbol in self.alphabet:
+                moved = self._closure(n for s in subset for n in self.transitions.get((s, symbol), ()))
+                if moved not in index:
+                    index[moved] = len(rows)
+                    rows.append(None)
+                    pending.append(moved)
+                row.append(index[moved])
+            rows[index[subset]] = row + [0]
+        accepting = [i for subset, i in index.items() if subset & self.accepting]
+        return DFA(self.alphabet, np.array(rows), 1, accepting)
+
+# Any string over {a,b} whose last two symbols are a, b
+END_AB = NFA("ab", {(0, "a"): {0, 1}, (0, "b"): {0}, (1, "b"): {2}}, start=0, accepting=[2]).to_dfa().minimize()
+
 def accepts_end_ab(s: str) -> bool:
+    return END_AB.accepts(s)
+
+def accepts_end_ab_chain(s: str) -> bool:
+    # The original hand-written version, kept as the benchmark baseline
     # States: S0 (start), S1 (seen a), S2 (other), ACCEPT (ends with 'ab')
     state = "S0"
     for ch in s:
@@ -15,6 +168,34 @@ def accepts_end_ab(s: str) -> bool:
             state = "S1" if ch == "a" else "S2"
     return state == "ACCEPT"
 
-tests = ["", "ab", "aab", "aba", "b", "aaab", "ba"]
-for t in tests:
-    print(t, accepts_end_ab(t))
+def bench(n: int = 1_000_000, max_len: int = 24, seed: int = 0):
+    rng = random.Random(seed)
+    strings = ["".join(rng.choices("ab" if rng.random() < 0.95 else "abc", k=rng.randint(0, max_len)))
+               for _ in range(n)]
+    total_chars = sum(map(len, strings))
+
+    t0 = time.perf_counter()
+    expected = [accepts_end_ab_chain(s) for s in strings]
+    chain = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scalar = [accepts_end_ab(s) for s in strings]
+    table = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = END_AB.accepts_many(strings)
+    vectorized = time.perf_counter() - t0
+
+    assert scalar == expected and batch.tolist() == expected
+    print(f"{n:,} strings, {total_chars:,} chars, DFA with {END_AB.n_states} states")
+    for label, secs in (("string-state chain", chain), ("table, per string", table), ("table, batched", vectorized)):
+        print(f"{label:<20} {secs:6.2f}s  {n / secs / 1e6:6.2f} M strings/s")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+
+    tests = ["", "ab", "aab", "aba", "b", "aaab", "ba"]
+    for t in tests:
+        print(t, accepts_end_ab(t))
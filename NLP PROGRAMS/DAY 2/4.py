@@ -1,5 +1,10 @@
 # Simple pluralization via rule "states"
-def pluralize(noun: str) -> str:
+import random
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def pluralize_chain(noun: str) -> str:
     vowels = "aeiou"
     # States: END_Y, SIBILANT, DEFAULT
     if noun.endswith("y") and (len(noun) > 1 and noun[-2].lower() not in vowels):
@@ -11,6 +16,200 @@ def pluralize(noun: str) -> str:
     else:
         return noun + "s"
 
-tests = ["city", "dog", "box", "buzz", "dish", "boy"]
-for t in tests:
-    print(t, "->", pluralize(t))
+# -----------------------------
+# Inflection engine
+# -----------------------------
+# A rule is (suffix, strip, append): a word ending in `suffix` loses its last `strip`
+# characters and gains `append`. Rules and whole-word irregulars are compiled into one
+# trie over reversed words, so the longest applicable rule is found in a single walk
+# from the end of the word. Irregulars sit behind an end-of-word anchor and so only
+# match whole words, and they beat any suffix rule.
+VOWELS = "aeiou"
+
+PLURAL_RULES: List[Tuple[str, int, str]] = (
+    [("", 0, "s"), ("y", 1, "ies")]
+    + [(v + "y", 0, "s") for v in VOWELS]
+    + [(s, 0, "es") for s in ("s", "x", "z", "sh", "ch")]
+    + [("man", 2, "en"), ("sis", 2, "es"), ("xis", 2, "es")]
+)
+
+SINGULAR_RULES: List[Tuple[str, int, str]] = (
+    [("", 0, ""), ("s", 1, ""), ("ss", 0, ""), ("us", 0, ""), ("is", 0, ""), ("ies", 3, "y")]
+    + [(s + "es", 2, "") for s in ("ss", "x", "zz", "sh", "ch")]
+    + [("men", 2, "an"), ("yses", 2, "is")]
+)
+
+# Singular nouns that end in -men; without them the -men -> -man rule would turn
+# "specimen" into "speciman".
+MEN_SINGULARS = ("abdomen", "acumen", "albumen", "bitumen", "cognomen", "hymen", "lumen",
+                 "omen", "regimen", "semen", "specimen", "stamen")
+
+# singular -> plural
+IRREGULAR_NOUNS: Dict[str, str] = {
+    "child": "children", "man": "men", "woman": "women", "person": "people", "mouse": "mice",
+    "louse": "lice", "goose": "geese", "foot": "feet", "tooth": "teeth", "ox": "oxen",
+    "leaf": "leaves", "knife": "knives", "wife": "wives", "life": "lives", "wolf": "wolves",
+    "half": "halves", "calf": "calves", "shelf": "shelves", "thief": "thieves", "elf": "elves",
+    "loaf": "loaves", "self": "selves", "scarf": "scarves", "potato": "potatoes",
+    "tomato": "tomatoes", "hero": "heroes", "echo": "echoes", "veto": "vetoes",
+    "torpedo": "torpedoes", "cactus": "cacti", "fungus": "fungi", "nucleus": "nuclei",
+    "radius": "radii", "stimulus": "stimuli", "syllabus": "syllabi", "phenomenon": "phenomena",
+    "criterion": "criteria", "datum": "data", "medium": "media", "bacterium": "bacteria",
+    "curriculum": "curricula", "matrix": "matrices", "vertex": "vertices", "index": "indices",
+    "appendix": "appendices", "quiz": "quizzes", "human": "humans", "german": "germans",
+    "roman": "romans", "shaman": "shamans", "talisman": "talismans", "stomach": "stomachs",
+    "monarch": "monarchs", "epoch": "epochs", "bus": "buses", "movie": "movies",
+    "genus": "genera", "corpus": "corpora", "axis": "axes",
+    **{word: word + "s" for word in MEN_SINGULARS},
+}
+UNINFLECTED = ("sheep", "fish", "deer", "series", "species", "moose", "aircraft", "news",
+               "offspring", "salmon", "trout", "swine", "bison", "information", "equipment",
+               "chassis")
+
+MEMO_SIZE = 1 << 18   # per-direction memo entries before it is reset
+
+_VALUE, _ANCHOR = "", "^"   # neither is a letter, so they never collide with a child edge
+
+class SuffixTrie:
+    def __init__(self):
+        self.root: dict = {}
+
+    def add_suffix(self, suffix: str, strip: int, append: str):
+        node = self.root
+        for ch in reversed(suffix):
+            node = node.setdefault(ch, {})
+        node[_VALUE] = (strip, append)
+
+    def add_word(self, word: str, replacement: str):
+        node = self.root
+        for ch in reversed(word):
+            node = node.setdefault(ch, {})
+        node.setdefault(_ANCHOR, {})[_VALUE] = (len(word), replacement)
+
+    def lookup(self, word: str) -> Optional[Tuple[int, str]]:
+        """(strip, append) of the longest matching suffix rule, or the whole-word entry."""
+        node = self.root
+        best = node.get(_VALUE)
+        for ch in reversed(word):
+            node = node.get(ch)
+            if node is None:
+                return best
+            best = node.get(_VALUE, best)
+        anchored = node.get(_ANCHOR)
+        return anchored[_VALUE] if anchored is not None else best
+
+class Inflector:
+    def __init__(self, plural_rules=PLURAL_RULES, singular_rules=SINGULAR_RULES,
+                 irregulars: Dict[str, str] = IRREGULAR_NOUNS, uninflected: Iterable[str] = UNINFLECTED):
+        self._plural, self._singular = SuffixTrie(), SuffixTrie()
+        for suffix, strip, append in plural_rules:
+            self._plural.add_suffix(suffix, strip, append)
+        for suffix, strip, append in singular_rules:
+            self._singular.add_suffix(suffix, strip, append)
+        for singular, plural in irregulars.items():
+            self._plural.add_word(singular, plural)
+            self._singular.add_word(plural, singular)
+            self._singular.add_word(singular, singular)   # already singular: leave it
+        for word in uninflected:
+            self._plural.add_word(word, word)
+            self._singular.add_word(word, word)
+        self._memo: Dict[SuffixTrie, Dict[str, str]] = {self._plural: {}, self._singular: {}}
+
+    @staticmethod
+    def _inflect(trie: SuffixTrie, word: str) -> str:
+        if not word:
+            return word
+        strip, append = trie.lookup(word.lower())
+        if word.isupper() and len(word) > 1:
+            append = append.upper()
+        elif strip == len(word) and word[0].isupper():
+            append = append[:1].upper() + append[1:]
+        return word[:len(word) - strip] + append
+
+    def _remember(self, trie: SuffixTrie, word: str) -> str:
+        memo = self._memo[trie]
+        if len(memo) >= MEMO_SIZE:
+            memo.clear()
+        result = memo[word] = self._inflect(trie, word)
+        return result
+
+    def pluralize(self, noun: str) -> str:
+        return self._memo[self._plural].get(noun) or self._remember(self._plural, noun)
+
+    def singularize(self, noun: str) -> str:
+        return self._memo[self._singular].get(noun) or self._remember(self._singular, noun)
+
+    def _many(self, trie: SuffixTrie, words: Iterable[str]) -> List[str]:
+        get, remember = self._memo[trie].get, self._remember
+        return [get(w) or remember(trie, w) for w in words]
+
+    def pluralize_many(self, nouns: Iterable[str]) -> List[str]:
+        """pluralize() over an iterable, memoized across calls."""
+        return self._many(self._plural, nouns)
+
+    def singularize_many(self, nouns: Iterable[str]) -> List[str]:
+        return self._many(self._singular, nouns)
+
+INFLECTOR = Inflector()
+
+def pluralize(noun: str) -> str:
+    return INFLECTOR.pluralize(noun)
+
+def singularize(noun: str) -> str:
+    return INFLECTOR.singularize(noun)
+
+def bench(n: int = 1_000_000, vocab_size: int = 50_000, seed: int = 0):
+    rng = random.Random(seed)
+    endings = ["", "y", "ey", "s", "sh", "ch", "x", "z", "man", "is", "o", "f", "fe"]
+    vocab = ["".join(rng.choices("abcdefghijklmnoprstuvw", k=rng.randint(3, 8))) + rng.choice(endings)
+             for _ in range(vocab_size)] + list(IRREGULAR_NOUNS) + list(UNINFLECTED)
+    # Zipf-like reuse, as in real text
+    words = [vocab[min(int(rng.paretovariate(1.1)) - 1, len(vocab) - 1)] if rng.random() < 0.7
+             else rng.choice(vocab) for _ in range(n)]
+
+    t0 = time.perf_counter()
+    [pluralize_chain(w) for w in words]
+    chain = time.perf_counter() - t0
+    inflector = Inflector()
+    t0 = time.perf_counter()
+    [inflector._inflect(inflector._plural, w) for w in words]
+    single = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    inflector.pluralize_many(words)
+    many = time.perf_counter() - t0
+
+    print(f"{n:,} words ({len(set(words)):,} distinct)")
+    for label, secs in (("if-chain", chain), ("trie, unmemoized", single), ("pluralize_many", many)):
+        print(f"{label:<17} {secs:6.2f}s  {n / secs / 1e6:5.2f} M words/s")
+    wrong = sum(pluralize_chain(s) != p for s, p in IRREGULAR_NOUNS.items())
+    print(f"if-chain gets {wrong} of {len(IRREGULAR_NOUNS)} irregular nouns wrong; the engine gets 0")
+
+def check():
+    # -is only becomes -es after s or x, so "this" is not "thes"
+    for singular, plural in [("this", "thises"), ("his", "hises"), ("iris", "irises"),
+                             ("crisis", "crises"), ("chassis", "chassis")]:
+        assert pluralize(singular) == plural, (singular, pluralize(singular))
+        assert singularize(singular) == singular, (singular, singularize(singular))
+    round_trips = [("analysis", "analyses"), ("axis", "axes"), ("specimen", "specimens"),
+                   ("abdomen", "abdomens"), ("omen", "omens"), ("fireman", "firemen"),
+                   ("woman", "women"), ("human", "humans")]
+    for singular, plural in round_trips:
+        assert pluralize(singular) == plural, (singular, pluralize(singular))
+        assert singularize(plural) == singular, (plural, singularize(plural))
+        assert singularize(singular) == singular, (singular, singularize(singular))
+    print(f"ok: {len(round_trips)} singular/plural pairs round-trip")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+    if "--check" in sys.argv:
+        check()
+        sys.exit()
+
+    tests = ["city", "dog", "box", "buzz", "dish", "boy"]
+    for t in tests:
+        print(t, "->", pluralize(t))
+
+    for t in ["child", "Knife", "analysis", "sheep", "fireman", "human", "city", "bus", "mouse"]:
+        print(t, "->", pluralize(t), "->", singularize(pluralize(t)))
@@ -1,8 +1,166 @@
 # pip install nltk
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+
 import nltk
 from nltk.stem import PorterStemmer
 
 # nltk.download('punkt')  # first time
-ps = PorterStemmer()
-words = nltk.word_tokenize("Caresses ponies caresser cats running agreed meetings")
-print([(w, ps.stem(w)) for w in words])
+
+# -----------------------------
+# Cached, parallel stemming
+# -----------------------------
+STEM_CACHE_SIZE = 500_000
+POOL_MIN_TOKENS = 20_000   # fewer unseen tokens than this are stemmed in-process
+POOL_CHUNK = 5_000
+
+_STEMMER = PorterStemmer()
+
+def _stem_chunk(words: List[str]) -> List[str]:
+    stem = _STEMMER.stem
+    return [stem(w) for w in words]
+
+class StemService:
+    """
+    PorterStemmer behind a per-batch dedup and a bounded LRU stem table. Unseen
+    tokens of a large batch are stemmed across a process pool; output always
+    follows input order.
+    """
+    def __init__(self, maxsize: int = STEM_CACHE_SIZE, workers: Optional[int] = None,
+                 table_path: Optional[str] = None, pool_min: int = POOL_MIN_TOKENS):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.pool_min = pool_min
+        self.table_path = table_path
+        self._table: "OrderedDict[str, str]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+        if table_path and os.path.exists(table_path):
+            self.load(table_path)
+
+    def stem(self, word: str) -> str:
+        return self.stem_batch([word])[0]
+
+    def stem_batch(self, tokens: List[str]) -> List[str]:
+        table = self._table
+        unique = dict.fromkeys(tokens)
+        missing = []
+        for w in unique:
+            s = table.get(w)
+            if s is None:
+                missing.append(w)
+            else:
+                unique[w] = s
+                table.move_to_end(w)
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+        for w, s in zip(missing, self._stem_missing(missing)):
+            unique[w] = s
+            self._put(w, s)
+        return [unique[w] for w in tokens]
+
+    def stem_stream(self, batches: Iterable[List[str]]) -> Iterator[List[str]]:
+        for batch in batches:
+            yield self.stem_batch(batch)
+
+    def _stem_missing(self, words: List[str]) -> List[str]:
+        if len(words) < self.pool_min or self.workers == 1:
+            return _stem_chunk(words)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        chunks = [words[i:i + POOL_CHUNK] for i in range(0, len(words), POOL_CHUNK)]
+        return [s for chunk in self._pool.map(_stem_chunk, chunks) for s in chunk]
+
+    def _put(self, word: str, stem: str):
+        self._table[word] = stem
+        if len(self._table) > self.maxsize:
+            self._table.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of distinct per-batch tokens found in the table (duplicates never reach it)."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.table_path
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(list(self._table.items()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> int:
+        with open(path, "rb") as f:
+            for word, stem in pickle.load(f):
+                self._put(word, stem)
+        return len(self._table)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+BASES = ["connect", "run", "agree", "meet", "care", "pony", "cat", "general", "operate", "relate",
+         "happy", "nation", "argue", "sensitive", "adjust", "play", "control", "hope", "study", "write",
+         "formal", "digit", "communicate", "organize", "product", "analyze", "predict", "effect"]
+AFFIXES = ["", "s", "es", "ed", "ing", "er", "ers", "ion", "ions", "ional", "ization", "ness", "ly",
+           "ment", "ments", "able", "ability", "ive", "ively", "ful", "fulness", "ousness", "ize", "izes"]
+
+def make_text(n_tokens: int, seed: int = 0) -> List[str]:
+    """Zipf-ish token stream over ~700 surface forms plus a long tail of rare ones."""
+    rng = random.Random(seed)
+    forms = [b + a for b in BASES for a in AFFIXES]
+    tokens = []
+    for _ in range(n_tokens):
+        if rng.random() < 0.02:
+            tokens.append("".join(rng.choices("abcdefghilmnoprstu", k=rng.randint(4, 10))) + rng.choice(AFFIXES))
+        else:
+            tokens.append(forms[min(int(rng.paretovariate(0.8)) - 1, len(forms) - 1)])
+    return tokens
+
+def bench(n_tokens: int = 2_000_000, batch_size: int = 100_000):
+    tokens = make_text(n_tokens)
+    batches = [tokens[i:i + batch_size] for i in range(0, len(tokens), batch_size)]
+
+    t0 = time.perf_counter()
+    expected = [_STEMMER.stem(w) for w in tokens]
+    base = time.perf_counter() - t0
+    print(f"{n_tokens:,} tokens, {len(set(tokens)):,} distinct")
+    print(f"{'per-token stem':<26} {n_tokens / base:10,.0f} tokens/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table_path = os.path.join(tmp, "stems.pkl")
+        runs = (("dedup per batch", dict(maxsize=0, workers=1)),
+                ("dedup + cache", dict(workers=1)),
+                (f"dedup + cache + {os.cpu_count()} procs", dict(pool_min=1_000)),
+                ("preloaded stem table", dict(table_path=table_path)))
+        for label, kwargs in runs:
+            service = StemService(**kwargs)
+            t0 = time.perf_counter()
+            out = [s for batch in service.stem_stream(batches) for s in batch]
+            elapsed = time.perf_counter() - t0
+            assert out == expected
+            service.save(table_path)
+            service.close()
+            print(f"{label:<26} {n_tokens / elapsed:10,.0f} tokens/s  "
+                  f"x{base / elapsed:5.1f}  hit rate {service.hit_rate:6.1%}")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+
+    ps = PorterStemmer()
+    words = nltk.word_tokenize("Caresses ponies caresser cats running agreed meetings")
+    print([(w, ps.stem(w)) for w in words])
+
+    service = StemService()
+    print(list(zip(words, service.stem_batch(words))))
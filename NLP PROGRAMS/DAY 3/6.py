@@ -1,28 +1,309 @@
+import json
+import os
 import random
 import re
-from collections import defaultdict
+import resource
+import sys
+import tempfile
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
 
 text = """
 the cat sat on the mat . the cat ate a rat . the rat sat too .
 the dog saw the cat . the dog chased the cat . the cat ran .
 """
 
-# Build bigram model
-tokens = re.findall(r"\w+|[.]", text.lower())
-bigrams = defaultdict(list)
-for w1, w2 in zip(tokens, tokens[1:]):
-    bigrams[w1].append(w2)
+TOKEN = re.compile(r"\w+|[.]")
+
+def tokenize(line: str) -> List[str]:
+    return TOKEN.findall(line.lower())
+
+# -----------------------------
+# N-gram model
+# -----------------------------
+# Words are integer ids. Level k holds every distinct k-gram as one sorted uint64
+# key, (row of its (k-1)-word context in level k-1) << 32 | last word id, with a
+# uint32 count. Level 1's single context is row 0. Since keys sort by context, each
+# context's successors are one contiguous slice, located through a CSR offsets
+# array; a running cumulative count per level turns a draw into one binary search
+# inside that slice. Memory grows with distinct n-grams, not with corpus length.
+BUILD_CHUNK = 1 << 22        # token positions per pass when building a level
+MAGIC = b"NGRAM1\n"
+ALIGN = 64
+
+class NGramModel:
+    def __init__(self, order: int = 2, smoothing: float = 1.0):
+        """`smoothing` is the interpolation weight kept at each order (1.0 = pure backoff)."""
+        self.order = order
+        self.smoothing = smoothing
+        self.vocab: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.keys: List[np.ndarray] = []      # per level, sorted uint64
+        self.counts: List[np.ndarray] = []    # per level, uint32
+        self.cum: List[np.ndarray] = []       # per level, running uint64 sum of counts
+        self.offsets: List[np.ndarray] = []   # per level, CSR over level k-1 rows
+
+    # ---- training ----
+    def encode(self, tokens: Iterable[str], out: array):
+        ids = self.ids
+        for tok in tokens:
+            i = ids.get(tok)
+            if i is None:
+                i = ids[tok] = len(self.vocab)
+                self.vocab.append(tok)
+            out.append(i)
+
+    def train_lines(self, lines: Iterable[str]) -> "NGramModel":
+        seq = array("i")
+        for line in lines:
+            self.encode(tokenize(line), seq)
+        return self.train_ids(np.frombuffer(seq, dtype=np.int32))
+
+    def train_files(self, paths: Sequence[str]) -> "NGramModel":
+        """Stream files line by line; only the int32 id sequence is kept while counting."""
+        def lines():
+            for path in paths:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    yield from f
+        return self.train_lines(lines())
+
+    def train_ids(self, seq: np.ndarray) -> "NGramModel":
+        self.keys, self.counts, self.cum, self.offsets = [], [], [], []
+        n_ctx = 1
+        rows: Optional[np.ndarray] = None      # row in the previous level of the gram ending at each position
+        for k in range(1, self.order + 1):
+            keys, counts = self._count_level(seq, rows, k)
+            if not len(keys):
+                break
+            self.keys.append(keys)
+            self.counts.append(counts)
+            self.cum.append(np.cumsum(counts, dtype=np.uint64))
+            self.offsets.append(np.searchsorted(keys >> np.uint64(32), np.arange(n_ctx + 1, dtype=np.uint64)))
+            rows = self._rows(seq, rows, keys, k)
+            n_ctx = len(keys)
+        return self
+
+    @staticmethod
+    def _level_keys(seq: np.ndarray, rows: Optional[np.ndarray], k: int, lo: int, hi: int) -> np.ndarray:
+        # Keys of the k-grams ending at positions lo..hi-1 (only positions >= k-1 have one)
+        lo, hi = max(lo, k - 1), min(hi, len(seq))
+        words = seq[lo:hi].astype(np.uint64)
+        if k == 1:
+            return words
+        return (rows[lo - 1:hi - 1].astype(np.uint64) << np.uint64(32)) | words
+
+    def _count_level(self, seq, rows, k):
+        # Sort the level's keys in place and count runs: one uint64 array, no unique() temporaries
+        keys = np.empty(max(len(seq) - k + 1, 0), dtype=np.uint64)
+        for lo in range(0, len(seq), BUILD_CHUNK):
+            start = max(lo, k - 1)
+            keys[start - k + 1:lo + BUILD_CHUNK - k + 1] = self._level_keys(seq, rows, k, lo, lo + BUILD_CHUNK)
+        if not len(keys):
+            return keys, np.empty(0, dtype=np.uint32)
+        keys.sort()
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        counts = np.diff(np.append(starts, len(keys))).astype(np.uint32)
+        return keys[starts], counts
+
+    def _rows(self, seq, rows, keys, k):
+        out = np.full(len(seq), -1, dtype=np.int32)
+        for lo in range(0, len(seq), BUILD_CHUNK):
+            start = max(lo, k - 1)
+            out[start:lo + BUILD_CHUNK] = np.searchsorted(keys, self._level_keys(seq, rows, k, lo, lo + BUILD_CHUNK))
+        return out
+
+    # ---- lookups ----
+    def _row(self, gram: Sequence[int]) -> int:
+        """Row of `gram` in level len(gram), or -1 if it was never seen."""
+        row = 0
+        for k, w in enumerate(gram):
+            keys = self.keys[k]
+            key = np.uint64(row << 32 | w)
+            row = int(np.searchsorted(keys, key))
+            if row == len(keys) or keys[row] != key:
+                return -1
+        return row
+
+    def _context_rows(self, context: Sequence[int]) -> List[int]:
+        """rows[j] = row of the last j context words in level j (rows[0] = 0, the empty context)."""
+        rows = [0]
+        for j in range(1, min(len(context), self.order - 1, len(self.keys) - 1) + 1):
+            row = self._row(context[-j:])
+            if row < 0:
+                break
+            rows.append(row)
+        return rows
+
+    def _successors(self, level: int, row: int):
+        offsets = self.offsets[level]
+        return int(offsets[row]), int(offsets[row + 1])
+
+    def _draw(self, level: int, lo: int, hi: int, rng: random.Random) -> int:
+        cum = self.cum[level]
+        base = int(cum[lo - 1]) if lo else 0
+        target = base + rng.random() * (int(cum[hi - 1]) - base)
+        i = lo + int(np.searchsorted(cum[lo:hi], target, side="right"))
+        return int(self.keys[level][min(i, hi - 1)] & np.uint64(0xFFFFFFFF))
+
+    def next_id(self, context: Sequence[int], rng: random.Random = random) -> int:
+        """Sample the next word id, backing off from the longest context with successors."""
+        return self._next(self._context_rows(context), rng)
+
+    def _dead_end(self, rows: List[int]) -> bool:
+        """No context of one or more words has ever been followed by anything."""
+        return all(lo == hi for lo, hi in (self._successors(j, row) for j, row in enumerate(rows) if j))
+
+    def _next(self, rows: List[int], rng: random.Random) -> int:
+        for j in range(len(rows) - 1, -1, -1):
+            lo, hi = self._successors(j, rows[j])
+            if hi > lo and (j == 0 or rng.random() < self.smoothing):
+                return self._draw(j, lo, hi, rng)
+        raise ValueError("empty model")
+
+    def prob(self, word: str, context: Sequence[str] = ()) -> float:
+        """Interpolated P(word | context): smoothing * ML estimate + (1 - smoothing) * lower order."""
+        w = self.ids.get(word)
+        if w is None or not self.keys:
+            return 0.0
+        ctx: List[int] = []
+        for c in context:
+            i = self.ids.get(c)
+            ctx = [] if i is None else ctx + [i]    # an unknown word cuts the usable context
+        rows = self._context_rows(ctx)
+        p = 0.0
+        for j, row in enumerate(rows):
+            lo, hi = self._successors(j, row)
+            total = int(self.cum[j][hi - 1]) - (int(self.cum[j][lo - 1]) if lo else 0) if hi > lo else 0
+            key = np.uint64(row << 32 | w)
+            i = lo + int(np.searchsorted(self.keys[j][lo:hi], key))
+            count = int(self.counts[j][i]) if i < hi and self.keys[j][i] == key else 0
+            if total:     # a context with no successors backs off, as next_id() does
+                p = count / total if j == 0 else self.smoothing * count / total + (1 - self.smoothing) * p
+        return p
+
+    def generate(self, start: str = "the", max_len: int = 30, rng: random.Random = random) -> str:
+        out = [start]
+        context = [self.ids.get(start, -1)]
+        for _ in range(max_len - 1):
+            rows = self._context_rows([c for c in context if c >= 0])
+            if self.order > 1 and self._dead_end(rows):
+                out.append(".")     # unseen or final word: end the sentence, as the bigram table did
+                break
+            w = self._next(rows, rng)
+            out.append(self.vocab[w])
+            context = (context + [w])[-(self.order - 1):] if self.order > 1 else []
+            if out[-1] == ".":
+                break
+        return " ".join(out)
+
+    # ---- persistence ----
+    def save(self, path: str):
+        """One file: header JSON, then 64-byte-aligned raw arrays that load() memory-maps."""
+        arrays = {"vocab": np.frombuffer("\n".join(self.vocab).encode("utf-8"), dtype=np.uint8)}
+        for k in range(len(self.keys)):
+            for name in ("keys", "counts", "cum", "offsets"):
+                arrays[f"{name}{k}"] = np.ascontiguousarray(getattr(self, name)[k])
+        layout, pos = {}, 0
+        for name, arr in arrays.items():
+            layout[name] = [pos, arr.dtype.str, list(arr.shape)]
+            pos += -(-arr.nbytes // ALIGN) * ALIGN
+        header = json.dumps({"order": self.order, "smoothing": self.smoothing,
+                             "levels": len(self.keys), "arrays": layout}).encode()
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+        with open(path, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name, arr in arrays.items():
+                f.seek(data_start + layout[name][0])
+                f.write(arr.tobytes())
+            f.truncate(data_start + pos)
+
+    @classmethod
+    def load(cls, path: str) -> "NGramModel":
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an n-gram model file")
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+        data_start = -(-(len(MAGIC) + 8 + size) // ALIGN) * ALIGN
+        model = cls(header["order"], header["smoothing"])
+
+        def view(name):
+            offset, dtype, shape = header["arrays"][name]
+            if not np.prod(shape):
+                return np.empty(shape, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode="r", offset=data_start + offset, shape=tuple(shape))
+
+        vocab = bytes(view("vocab")).decode("utf-8")
+        model.vocab = vocab.split("\n") if vocab else []
+        model.ids = {w: i for i, w in enumerate(model.vocab)}
+        for k in range(header["levels"]):
+            for name in ("keys", "counts", "cum", "offsets"):
+                getattr(model, name).append(view(f"{name}{k}"))
+        return model
+
+MODEL = NGramModel(order=2).train_lines(text.splitlines())
 
 def generate(start="the", max_len=30):
-    w = start
-    out = [w]
-    for _ in range(max_len-1):
-        nexts = bigrams.get(w) or ["."]
-        w = random.choice(nexts)
-        out.append(w)
-        if w == ".":
-            break
-    return " ".join(out)
-
-for _ in range(3):
-    print(generate("the"))
+    return MODEL.generate(start, max_len)
+
+def make_corpus(path: str, n_bytes: int, vocab_size: int = 50_000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = np.array(["".join(chr(97 + c) for c in rng.integers(0, 26, rng.integers(2, 9)))
+                      for _ in range(vocab_size)] + ["."])
+    with open(path, "w") as f:
+        written = 0
+        while written < n_bytes:
+            ranks = np.minimum(rng.zipf(1.2, 100_000) - 1, vocab_size)
+            line = " ".join(words[ranks]) + "\n"
+            f.write(line)
+            written += len(line)
+
+def bench(mb: int = 100, order: int = 3):
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "corpus.txt")
+        make_corpus(corpus, mb << 20)
+        rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        model = NGramModel(order=order).train_files([corpus])
+        train = time.perf_counter() - t0
+        peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss0) / 1024
+        n_grams = [len(k) for k in model.keys]
+
+        path = os.path.join(tmp, "model.ngram")
+        model.save(path)
+        t0 = time.perf_counter()
+        loaded = NGramModel.load(path)
+        load = time.perf_counter() - t0
+
+        rng = random.Random(0)
+        t0 = time.perf_counter()
+        n_words = sum(len(loaded.generate("the", 50, rng).split()) for _ in range(2_000))
+        gen = time.perf_counter() - t0
+
+        print(f"{mb} MB corpus, order {order}: n-grams per level {n_grams}, vocab {len(model.vocab):,}")
+        print(f"train {train:6.1f}s   peak RSS growth {peak:7.0f} MiB   "
+              f"model file {os.path.getsize(path) / 2**20:6.1f} MiB")
+        print(f"load (mmap) {load * 1e3:6.1f} ms   generate {n_words / gen:9,.0f} words/s")
+
+def check():
+    model = NGramModel(order=2).train_lines(["the cat ran"])
+    assert model.generate("the") == "the cat ran .", model.generate("the")
+    assert model.generate("zebra") == "zebra .", model.generate("zebra")
+    trigrams = NGramModel(order=3).train_lines(["a b c"])
+    assert trigrams.generate("b") == "b c .", trigrams.generate("b")
+    assert generate("too") == "too ."
+    print("ok: dead ends close the sentence")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+    if "--check" in sys.argv:
+        check()
+        sys.exit()
+
+    for _ in range(3):
+        print(generate("the"))
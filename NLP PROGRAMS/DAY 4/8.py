@@ -1,23 +1,170 @@
 # pip install nltk
-import nltk
+import json
+import os
+import random
+import sys
+import time
 from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import nltk
+import numpy as np
 
 # nltk.download('brown'); nltk.download('universal_tagset'); nltk.download('punkt')
 
-# Train a very simple unigram tagger from Brown
-tag_counts = defaultdict(Counter)
-from nltk.corpus import brown
-for sent in brown.tagged_sents(tagset='universal'):
-    for w, t in sent:
-        tag_counts[w.lower()][t] += 1
-
-def most_likely_tag(word):
-    counts = tag_counts.get(word.lower())
-    if counts:
-        return counts.most_common(1)[0][0]
-    return "NOUN"  # default backoff
-
-text = "I will book a table tonight and watch birds fly."
-tokens = nltk.word_tokenize(text)
-tags = [(w, most_likely_tag(w)) for w in tokens]
-print(tags)
+# -----------------------------
+# Precomputed word -> tag lexicon
+# -----------------------------
+# Built once from a tagged corpus: every lowercased word keeps its most frequent
+# tag (ties go to the tag seen first, as Counter.most_common does). The file holds
+# the words as one sorted fixed-width byte array plus a uint8 tag code per word;
+# load() memory-maps both, so every process that opens it shares the same pages.
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "brown_universal.lex")
+MAGIC = b"LEXICON1\n"
+ALIGN = 64
+BACKOFF = "NOUN"
+
+class Lexicon:
+    def __init__(self, words: np.ndarray, codes: np.ndarray, tags: Sequence[str],
+                 path: Optional[str] = None):
+        self.words = words        # sorted, dtype S<width>, lowercased UTF-8
+        self.codes = codes        # uint8 index into tags
+        self.tags = np.array(list(tags) + [BACKOFF], dtype=object)   # last entry: backoff
+        self.path = path
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __reduce__(self):
+        # A file-backed lexicon travels to worker processes as its path, not its arrays
+        if self.path:
+            return Lexicon.load, (self.path,)
+        return Lexicon, (self.words, self.codes, list(self.tags[:-1]))
+
+    @classmethod
+    def build(cls, tagged_sents: Iterable[Iterable[Tuple[str, str]]]) -> "Lexicon":
+        counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for sent in tagged_sents:
+            for w, t in sent:
+                c = counts[w.lower()]
+                c[t] = c.get(t, 0) + 1
+        tags = sorted({t for c in counts.values() for t in c})
+        code = {t: i for i, t in enumerate(tags)}
+        words = sorted(counts, key=lambda w: w.encode("utf-8"))
+        best = np.fromiter((code[max(c, key=c.get)] for c in map(counts.get, words)),
+                           dtype=np.uint8, count=len(words))
+        return cls(np.array([w.encode("utf-8") for w in words]), best, tags)
+
+    def tag_many(self, tokens: Sequence[str]) -> List[str]:
+        """Most likely tag of every token in one vectorized lookup; unseen words get NOUN."""
+        if not len(tokens) or not len(self.words):
+            return [BACKOFF] * len(tokens)
+        query = np.array([t.lower().encode("utf-8") for t in tokens])
+        idx = np.searchsorted(self.words, query)
+        np.minimum(idx, len(self.words) - 1, out=idx)
+        found = self.words[idx] == query
+        codes = np.where(found, self.codes[idx], len(self.tags) - 1)
+        return self.tags[codes].tolist()
+
+    def tag(self, tokens: Sequence[str]) -> List[Tuple[str, str]]:
+        return list(zip(tokens, self.tag_many(tokens)))
+
+    def save(self, path: str):
+        header = json.dumps({"tags": list(self.tags[:-1]), "width": self.words.dtype.itemsize,
+                             "n": len(self.words)}).encode()
+        words_at = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+        codes_at = words_at + -(-self.words.nbytes // ALIGN) * ALIGN
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            f.seek(words_at)
+            f.write(self.words.tobytes())
+            f.seek(codes_at)
+            f.write(self.codes.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Lexicon":
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a lexicon file")
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+        n, width = header["n"], header["width"]
+        words_at = -(-(len(MAGIC) + 8 + size) // ALIGN) * ALIGN
+        codes_at = words_at + -(-n * width // ALIGN) * ALIGN
+        if not n:
+            return cls(np.empty(0, dtype="S1"), np.empty(0, dtype=np.uint8), header["tags"], path)
+        words = np.memmap(path, dtype=f"S{width}", mode="r", offset=words_at, shape=(n,))
+        codes = np.memmap(path, dtype=np.uint8, mode="r", offset=codes_at, shape=(n,))
+        return cls(words, codes, header["tags"], path)
+
+def build_brown_lexicon(path: str = LEXICON_PATH) -> Lexicon:
+    from nltk.corpus import brown
+    lexicon = Lexicon.build(brown.tagged_sents(tagset='universal'))
+    lexicon.save(path)
+    return Lexicon.load(path)
+
+def load_lexicon(path: str = LEXICON_PATH) -> Lexicon:
+    """The saved lexicon, building it from Brown on first use."""
+    return Lexicon.load(path) if os.path.exists(path) else build_brown_lexicon(path)
+
+def train_counts(tagged_sents) -> Dict[str, Counter]:
+    # The original import-time model, kept as the benchmark baseline
+    tag_counts = defaultdict(Counter)
+    for sent in tagged_sents:
+        for w, t in sent:
+            tag_counts[w.lower()][t] += 1
+    return tag_counts
+
+def bench(n_tokens: int = 1_000_000, seed: int = 0):
+    from nltk.corpus import brown
+    t0 = time.perf_counter()
+    tag_counts = train_counts(brown.tagged_sents(tagset='universal'))
+    print(f"{'Counter model build':<22} {time.perf_counter() - t0:8.3f}s")
+    path = LEXICON_PATH + ".bench"
+    t0 = time.perf_counter()
+    Lexicon.build(brown.tagged_sents(tagset='universal')).save(path)
+    print(f"{'lexicon build + save':<22} {time.perf_counter() - t0:8.3f}s   "
+          f"{os.path.getsize(path) / 2**20:.1f} MiB on disk")
+    t0 = time.perf_counter()
+    lexicon = Lexicon.load(path)
+    print(f"{'lexicon load (mmap)':<22} {(time.perf_counter() - t0) * 1e3:8.3f}ms")
+
+    rng = random.Random(seed)
+    vocab = list(tag_counts)
+    tokens = [rng.choice(vocab).capitalize() if rng.random() < 0.1 else rng.choice(vocab)
+              for _ in range(n_tokens)]
+    tokens += ["unseenword%d" % i for i in range(n_tokens // 100)]
+
+    def most_likely_tag(word):
+        counts = tag_counts.get(word.lower())
+        return counts.most_common(1)[0][0] if counts else BACKOFF
+
+    t0 = time.perf_counter()
+    expected = [most_likely_tag(w) for w in tokens]
+    print(f"{'most_common per token':<22} {len(tokens) / (time.perf_counter() - t0):12,.0f} tokens/s")
+    t0 = time.perf_counter()
+    got = lexicon.tag_many(tokens)
+    print(f"{'tag_many':<22} {len(tokens) / (time.perf_counter() - t0):12,.0f} tokens/s")
+    assert got == expected
+    os.remove(path)
+
+if __name__ == "__main__":
+    if "--build" in sys.argv:
+        print(f"{len(build_brown_lexicon()):,} words -> {LEXICON_PATH}")
+        sys.exit()
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+
+    lexicon = load_lexicon()
+
+    def most_likely_tag(word):
+        return lexicon.tag_many([word])[0]
+
+    text = "I will book a table tonight and watch birds fly."
+    tokens = nltk.word_tokenize(text)
+    tags = [(w, most_likely_tag(w)) for w in tokens]
+    print(tags)
+    print(lexicon.tag(tokens))
@@ -1,6 +1,12 @@
 # pip install nltk
+import random
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
 import nltk
-from nltk.tag import RegexpTagger
+from nltk.tag import RegexpTagger, SequentialBackoffTagger
 
 # nltk.download('punkt')
 rules = [
@@ -12,8 +18,139 @@ rules = [
     (r'(The|the|A|a|An|an)$', 'DET'),
     (r'.*', 'NOUN')
 ]
+
+# -----------------------------
+# Compiled rule tagger
+# -----------------------------
+# The ordered rules become one alternation, (?:(rule0)|(rule1)|...), matched from
+# the start of the token like RegexpTagger's per-rule match. The engine tries the
+# alternatives left to right and stops at the first that matches, so rule priority
+# is unchanged; the wrapper group that closed last (m.lastindex) names the rule.
+# Rules are trusted code here, so they compile with plain `re` rather than through
+# RegexpTagger's timed patterns. A rule's tag depends only on the token, so it is
+# memoized per token; the backoff chain, which may look at the sentence, is only
+# consulted for tokens no rule matches.
+MEMO_SIZE = 1 << 20    # distinct tokens remembered before the memo is reset
+
+class _RuleMemo(dict):
+    """token -> tag of the first matching rule, or None if none matches; filled on a miss."""
+    def __init__(self, rule_tag):
+        super().__init__()
+        self._rule_tag = rule_tag
+
+    def __missing__(self, token: str) -> Optional[str]:
+        if len(self) >= MEMO_SIZE:
+            self.clear()
+        tag = self[token] = self._rule_tag(token)
+        return tag
+
+class CompiledRegexpTagger(SequentialBackoffTagger):
+    def __init__(self, regexps: Sequence[Tuple[str, str]], backoff: Optional[SequentialBackoffTagger] = None):
+        super().__init__(backoff)
+        parts, self._group_tag = [], {}
+        group = 1
+        for regexp, tag in regexps:
+            inner = re.compile(regexp)
+            if re.search(r"\\\d|\(\?P=", regexp):
+                raise ValueError(f"backreferences cannot be fused: {regexp!r}")
+            parts.append(f"({regexp})")
+            self._group_tag[group] = tag
+            group += 1 + inner.groups
+        self._match = re.compile("|".join(parts)).match if parts else None
+        self._memo: Dict[str, Optional[str]] = _RuleMemo(self.tag_token)
+
+    def tag_token(self, token: str) -> Optional[str]:
+        """Tag of the first rule matching `token`, or None; unmemoized, no backoff."""
+        m = self._match(token) if self._match else None
+        # The wrapper encloses its rule's own groups, so it is the last to close
+        return self._group_tag[m.lastindex] if m is not None else None
+
+    def choose_tag(self, tokens: Sequence[str], index: int, history: List[str]) -> Optional[str]:
+        return self._memo[tokens[index]]
+
+    def tag(self, tokens: Sequence[str]) -> List[Tuple[str, Optional[str]]]:
+        memo = self._memo
+        tags = [memo[t] for t in tokens]
+        backoff = self.backoff
+        if backoff is None or None not in tags:
+            return list(zip(tokens, tags))
+        history: List[str] = []
+        for i, tag in enumerate(tags):
+            history.append(tag if tag is not None else backoff.tag_one(tokens, i, history))
+        return list(zip(tokens, history))
+
+    def tag_docs(self, docs: Iterable[Sequence[str]]) -> List[List[Tuple[str, Optional[str]]]]:
+        """tag() for many token lists; the memo is shared, so a token is matched once overall."""
+        return [self.tag(doc) for doc in docs]
+
+    def tag_sents(self, sentences):
+        return self.tag_docs(sentences)
+
 tagger = RegexpTagger(rules)
+fast_tagger = CompiledRegexpTagger(rules)
+
+WORDS = ["the", "The", "a", "an", "cloud", "moving", "darkened", "quickly", "sudden", "darkness",
+         "walked", "running", "happiness", "softly", "table", "3.14", "42", "red", "sing", "bed"]
+
+def make_docs(n_tokens: int, doc_len: int = 200, seed: int = 0) -> List[List[str]]:
+    rng = random.Random(seed)
+    stems = ["".join(rng.choices("abcdefghilmnoprstuw", k=rng.randint(2, 8))) for _ in range(20_000)]
+    suffixes = ["", "", "s", "ing", "ed", "ly", "ness", "er"]
+    tokens = [rng.choice(WORDS) if rng.random() < 0.5
+              else stems[min(int(rng.paretovariate(1.0)) - 1, len(stems) - 1)] + rng.choice(suffixes)
+              for _ in range(n_tokens)]
+    return [tokens[i:i + doc_len] for i in range(0, n_tokens, doc_len)]
+
+def bench(n_tokens: int = 1_000_000):
+    docs = make_docs(n_tokens)
+    t0 = time.perf_counter()
+    expected = [tagger.tag(doc) for doc in docs]
+    base = time.perf_counter() - t0
+    print(f"{n_tokens:,} tokens, {len({t for d in docs for t in d}):,} distinct")
+    print(f"{'RegexpTagger.tag':<28} {n_tokens / base:12,.0f} tokens/s")
+
+    compiled = CompiledRegexpTagger(rules)
+    t0 = time.perf_counter()
+    unmemoized = [[(t, compiled.tag_token(t)) for t in doc] for doc in docs]
+    elapsed = time.perf_counter() - t0
+    print(f"{'fused regex, per token':<28} {n_tokens / elapsed:12,.0f} tokens/s  x{base / elapsed:5.1f}")
+    for label, run in (("fused + memo, tag()", lambda: [compiled.tag(doc) for doc in docs]),
+                       ("fused + memo, tag_docs()", lambda: compiled.tag_docs(docs))):
+        compiled = CompiledRegexpTagger(rules)
+        t0 = time.perf_counter()
+        out = run()
+        elapsed = time.perf_counter() - t0
+        assert out == expected
+        print(f"{label:<28} {n_tokens / elapsed:12,.0f} tokens/s  x{base / elapsed:5.1f}")
+    assert unmemoized == expected
+
+class _AfterDeterminer(SequentialBackoffTagger):
+    """Context-sensitive test backoff: NOUN right after a DET, VB elsewhere."""
+    def choose_tag(self, tokens, index, history):
+        return "NOUN" if index and history[index - 1] == "DET" else "VB"
+
+def check():
+    no_default = rules[:-1]
+    sents = [["the", "cloud", "moving", "red"], ["red", "an", "sing", "the", "42"], ["a", "bed"]]
+    reference = RegexpTagger(no_default, backoff=_AfterDeterminer())
+    compiled = CompiledRegexpTagger(no_default, backoff=_AfterDeterminer())
+    for _ in range(2):    # the second pass runs from the memo
+        assert compiled.tag_sents(sents) == reference.tag_sents(sents)
+    assert compiled._memo["cloud"] is None    # no rule matched, remembered as such
+    chained = RegexpTagger([(r"sing$", "VB")], backoff=compiled)   # as someone else's backoff
+    assert chained.tag(sents[1]) == RegexpTagger([(r"sing$", "VB")], backoff=reference).tag(sents[1])
+    assert CompiledRegexpTagger(no_default).tag(["cloud", "the"]) == [("cloud", None), ("the", "DET")]
+    print("ok: matches RegexpTagger with a context-sensitive backoff")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+    if "--check" in sys.argv:
+        check()
+        sys.exit()
 
-text = "The quickly moving clouds darkened suddenly"
-tokens = nltk.word_tokenize(text)
-print(tagger.tag(tokens))
+    text = "The quickly moving clouds darkened suddenly"
+    tokens = nltk.word_tokenize(text)
+    print(tagger.tag(tokens))
+    print(fast_tagger.tag(tokens))
@@ -1,7 +1,15 @@
 # pip install nltk
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
 import nltk
-from nltk.grammar import CFG
+from nltk.grammar import CFG, Nonterminal
 from nltk.parse import RecursiveDescentParser
+from nltk.tree import Tree
 
 # nltk.download('punkt')
 
@@ -15,8 +23,305 @@ N -> 'dog' | 'cat' | 'bone'
 V -> 'eats' | 'runs'
 """)
 
-parser = RecursiveDescentParser(grammar)
-sent = "the big dog eats a bone"
-tokens = nltk.word_tokenize(sent)
-for tree in parser.parse(tokens):
-    print(tree)
+# -----------------------------
+# CYK chart parsing
+# -----------------------------
+# The grammar is compiled to binary form: terminals inside longer right-hand sides get
+# a hidden preterminal, and right-hand sides longer than two are split with hidden
+# intermediate symbols. Unit productions are kept and closed over per cell instead of
+# being eliminated, and hidden symbols are spliced out again when trees are built, so
+# trees come back in the original grammar. Symbols are integers and every chart cell
+# is a Python int used as a bitset. The packed forest is the chart itself: a node's
+# derivations are recovered from the bitsets only when trees are asked for.
+BATCH_SIZE = 64
+
+class CNFGrammar:
+    def __init__(self, cfg: CFG):
+        self.labels: List[str] = []
+        self.hidden: List[bool] = []
+        self._ids: Dict[object, int] = {}
+        self.start = self._symbol(cfg.start())
+        self.lexical: Dict[str, int] = {}                     # token -> bitset of A with A -> token
+        binary: List[Tuple[int, int, int]] = []               # (A, B, C)
+        unary: List[Tuple[int, int]] = []                     # (A, B)
+        for prod in cfg.productions():
+            lhs, rhs = self._symbol(prod.lhs()), list(prod.rhs())
+            if not rhs:
+                raise ValueError(f"empty production {prod} is not supported by CYK")
+            if len(rhs) == 1 and not isinstance(rhs[0], Nonterminal):
+                self.lexical[rhs[0]] = self.lexical.get(rhs[0], 0) | 1 << lhs
+                continue
+            syms = []
+            for item in rhs:
+                if isinstance(item, Nonterminal):
+                    syms.append(self._symbol(item))
+                else:
+                    pre = self._symbol(("'", item), hidden=True)
+                    self.lexical[item] = self.lexical.get(item, 0) | 1 << pre
+                    syms.append(pre)
+            if len(syms) == 1:
+                unary.append((lhs, syms[0]))
+                continue
+            while len(syms) > 2:
+                rest = self._symbol(("|",) + tuple(syms[1:]), hidden=True)
+                binary.append((lhs, syms[0], rest))
+                lhs, syms = rest, syms[1:]
+            binary.append((lhs, syms[0], syms[1]))
+
+        n = len(self.labels)
+        # by_left[B] = [(C, bitset of A with A -> B C)]; right_any[B] = bitset of those C
+        grouped: Dict[Tuple[int, int], int] = {}
+        for a, b, c in set(binary):
+            grouped[b, c] = grouped.get((b, c), 0) | 1 << a
+        self.by_left: List[List[Tuple[int, int]]] = [[] for _ in range(n)]
+        self.right_any = [0] * n
+        for (b, c), amask in grouped.items():
+            self.by_left[b].append((c, amask))
+            self.right_any[b] |= 1 << c
+        self.binary_rules: List[List[Tuple[int, int]]] = [[] for _ in range(n)]    # A -> [(B, C)]
+        for a, b, c in set(binary):
+            self.binary_rules[a].append((b, c))
+        self.unary_rules: List[List[int]] = [[] for _ in range(n)]                 # A -> [B]
+        for a, b in set(unary):
+            self.unary_rules[a].append(b)
+        # up[B] = bitset of every A with A =>+ B through unit productions
+        self.up = [0] * n
+        for b in range(n):
+            seen, stack = 0, [b]
+            while stack:
+                x = stack.pop()
+                for a, y in unary:
+                    if y == x and not seen >> a & 1:
+                        seen |= 1 << a
+                        stack.append(a)
+            self.up[b] = seen
+
+    def _symbol(self, key, hidden: bool = False) -> int:
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self.labels)
+            self.labels.append(key.symbol() if isinstance(key, Nonterminal) else str(key))
+            self.hidden.append(hidden)
+        return i
+
+    def close(self, mask: int) -> int:
+        out, up = mask, self.up
+        while mask:
+            low = mask & -mask
+            out |= up[low.bit_length() - 1]
+            mask ^= low
+        return out
+
+class Chart:
+    """Filled CYK chart for one sentence, doubling as its packed parse forest."""
+    def __init__(self, g: CNFGrammar, tokens: Sequence[str]):
+        self.g = g
+        self.tokens = list(tokens)
+        n = len(self.tokens)
+        missing = [t for t in self.tokens if t not in g.lexical]
+        if missing:
+            raise ValueError("Grammar does not cover some of the input words: %s." %
+                             ", ".join(repr(t) for t in missing))
+        cells = self.cells = [[0] * (n + 1) for _ in range(n + 1)]    # cells[i][j] covers tokens[i:j]
+        for i, tok in enumerate(self.tokens):
+            cells[i][i + 1] = g.close(g.lexical[tok])
+        by_left, right_any = g.by_left, g.right_any
+        for width in range(2, n + 1):
+            for i in range(n - width + 1):
+                j = i + width
+                row, found = cells[i], 0
+                for k in range(i + 1, j):
+                    right = cells[k][j]
+                    if not right:
+                        continue
+                    left = row[k]
+                    while left:
+                        low = left & -left
+                        b = low.bit_length() - 1
+                        left ^= low
+                        if right_any[b] & right:
+                            for c, amask in by_left[b]:
+                                if right >> c & 1:
+                                    found |= amask
+                row[j] = g.close(found) if found else 0
+        self._counts: Dict[Tuple[int, int, int], int] = {}
+
+    def accepts(self) -> bool:
+        n = len(self.tokens)
+        return n > 0 and bool(self.cells[0][n] >> self.g.start & 1)
+
+    def _has(self, a: int, i: int, j: int) -> bool:
+        return bool(self.cells[i][j] >> a & 1)
+
+    def derivations(self, a: int, i: int, j: int) -> Iterator[Tuple]:
+        """Packed-forest node (a, i, j): ("lex",) | ("unary", b) | ("binary", b, c, k)."""
+        g = self.g
+        if j == i + 1 and g.lexical.get(self.tokens[i], 0) >> a & 1:
+            yield ("lex",)
+        for b in g.unary_rules[a]:
+            if self._has(b, i, j):
+                yield ("unary", b)
+        for b, c in g.binary_rules[a]:
+            for k in range(i + 1, j):
+                if self._has(b, i, k) and self._has(c, k, j):
+                    yield ("binary", b, c, k)
+
+    def count(self, a: Optional[int] = None, i: int = 0, j: Optional[int] = None, _active=None) -> int:
+        """Number of trees for (a, i, j) without building them; unit-production cycles count once."""
+        a = self.g.start if a is None else a
+        j = len(self.tokens) if j is None else j
+        if not self._has(a, i, j):
+            return 0
+        key = (a, i, j)
+        if key in self._counts:
+            return self._counts[key]
+        active = set() if _active is None else _active
+        if key in active:
+            return 0
+        active.add(key)
+        total = 0
+        for d in self.derivations(a, i, j):
+            if d[0] == "lex":
+                total += 1
+            elif d[0] == "unary":
+                total += self.count(d[1], i, j, active)
+            else:
+                total += self.count(d[1], i, d[3], active) * self.count(d[2], d[3], j, active)
+        active.discard(key)
+        self._counts[key] = total
+        return total
+
+    def _children(self, a: int, i: int, j: int, active: frozenset) -> Iterator[list]:
+        # Children lists of (a, i, j); a hidden symbol's own children get spliced into its parent
+        key = (a, i, j)
+        if key in active:
+            return
+        active = active | {key}
+        for d in self.derivations(a, i, j):
+            if d[0] == "lex":
+                yield [self.tokens[i]]
+            elif d[0] == "unary":
+                for sub in self._subtrees(d[1], i, j, active):
+                    yield sub
+            else:
+                _, b, c, k = d
+                for left in self._subtrees(b, i, k, active):
+                    for right in self._subtrees(c, k, j, active):
+                        yield left + right
+
+    def _subtrees(self, a: int, i: int, j: int, active: frozenset) -> Iterator[list]:
+        if self.g.hidden[a]:
+            yield from self._children(a, i, j, active)
+        else:
+            label = self.g.labels[a]
+            for children in self._children(a, i, j, active):
+                yield [Tree(label, children)]
+
+    def trees(self) -> Iterator[Tree]:
+        """Parse trees in the original grammar, built lazily one at a time."""
+        if self.accepts():
+            for (tree,) in self._subtrees(self.g.start, 0, len(self.tokens), frozenset()):
+                yield tree
+
+class CYKParser:
+    def __init__(self, cfg: CFG):
+        self.grammar = CNFGrammar(cfg)
+
+    def chart(self, tokens: Sequence[str]) -> Chart:
+        return Chart(self.grammar, tokens)
+
+    def parse(self, tokens: Sequence[str]) -> Iterator[Tree]:
+        return self.chart(tokens).trees()
+
+# Process pool: the compiled grammar is plain lists and dicts, sent once per worker
+_GRAMMAR: Optional[CNFGrammar] = None
+
+def _worker_init(g: CNFGrammar):
+    global _GRAMMAR
+    _GRAMMAR = g
+
+def _worker_batch(args) -> List[Tuple[int, List[Tree]]]:
+    sents, max_trees = args
+    out = []
+    for tokens in sents:
+        chart = Chart(_GRAMMAR, tokens)
+        out.append((chart.count(), list(islice(chart.trees(), max_trees))))
+    return out
+
+def parse_many(parser: CYKParser, sents: Sequence[Sequence[str]], workers: Optional[int] = None,
+               max_trees: int = 1, batch_size: int = BATCH_SIZE) -> List[Tuple[int, List[Tree]]]:
+    """(number of parses, first max_trees trees) per sentence, parsed across a process pool."""
+    batches = [(sents[i:i + batch_size], max_trees) for i in range(0, len(sents), batch_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init,
+                             initargs=(parser.grammar,)) as pool:
+        return [r for batch in pool.map(_worker_batch, batches) for r in batch]
+
+# PP attachment: every extra prepositional phrase multiplies the readings (Catalan numbers).
+# Right-recursive so the recursive-descent baseline can parse it at all.
+PP_GRAMMAR = CFG.fromstring("""
+S -> NP VP
+NP -> Det N | Det N PPS | 'john'
+VP -> V NP | V NP PPS
+PPS -> PP | PP PPS
+PP -> P NP
+Det -> 'the' | 'a'
+N -> 'man' | 'dog' | 'park' | 'telescope' | 'hill'
+V -> 'saw'
+P -> 'in' | 'with' | 'on'
+""")
+
+def pp_sentence(n_pp: int) -> List[str]:
+    nouns = ["park", "telescope", "hill", "dog"]
+    words = ["john", "saw", "the", "man"]
+    for i in range(n_pp):
+        words += [["in", "with", "on"][i % 3], "the", nouns[i % len(nouns)]]
+    return words
+
+def bench(max_pp: int = 10, rd_budget: float = 20.0, batch: int = 2_000):
+    cyk, rd = CYKParser(PP_GRAMMAR), RecursiveDescentParser(PP_GRAMMAR, max_time=None)
+    print(f"{'PPs':>3} {'tokens':>6} {'parses':>7} {'RD all':>9} {'CYK chart':>10} {'CYK all':>9}")
+    rd_on = True
+    for n_pp in range(max_pp + 1):
+        tokens = pp_sentence(n_pp)
+        t0 = time.perf_counter()
+        chart = cyk.chart(tokens)
+        n_parses = chart.count()
+        fill = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        trees = list(chart.trees())
+        enum = fill + time.perf_counter() - t0
+        assert len(trees) == n_parses
+        rd_cell = "-"
+        if rd_on:
+            t0 = time.perf_counter()
+            expected = list(rd.parse(tokens))
+            elapsed = time.perf_counter() - t0
+            assert sorted(map(str, expected)) == sorted(map(str, trees))
+            rd_cell = f"{elapsed:8.3f}s"
+            rd_on = elapsed < rd_budget / 10
+        print(f"{n_pp:>3} {len(tokens):>6} {n_parses:>7,} {rd_cell:>9} {fill:9.4f}s {enum:8.3f}s")
+
+    sents = [pp_sentence(i % 6) for i in range(batch)]
+    t0 = time.perf_counter()
+    local = [(c.count(), list(islice(c.trees(), 1))) for c in map(cyk.chart, sents)]
+    single = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pooled = parse_many(cyk, sents)
+    multi = time.perf_counter() - t0
+    assert pooled == local
+    print(f"batch of {batch:,}: {batch / single:8,.0f} sents/s in-process, "
+          f"{batch / multi:8,.0f} sents/s across {os.cpu_count()} procs")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+
+    parser = RecursiveDescentParser(grammar)
+    sent = "the big dog eats a bone"
+    tokens = nltk.word_tokenize(sent)
+    for tree in parser.parse(tokens):
+        print(tree)
+
+    for tree in CYKParser(grammar).parse(tokens):
+        print(tree)
@@ -1,7 +1,14 @@
 # pip install nltk
+import heapq
+import sys
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Sequence, Tuple
+
 import nltk
-from nltk.grammar import CFG
+from nltk.grammar import CFG, Nonterminal
 from nltk.parse import EarleyChartParser
+from nltk.tree import Tree
 
 grammar = CFG.fromstring("""
 S -> S Conj S | NP VP
@@ -13,7 +20,429 @@ N -> 'dog' | 'cat' | 'park'
 V -> 'sees' | 'runs'
 """)
 
-parser = EarleyChartParser(grammar)
-sentence = "the dog sees the cat and the cat runs"
-for tree in parser.parse(sentence.split()):
-    print(tree)
+# -----------------------------
+# Compiled Earley parsing
+# -----------------------------
+# EarleyGrammar is built once per grammar. Symbols (terminals too) are ints, every
+# dotted rule is an int state with the symbol after its dot precomputed, and an item
+# (state, origin) is the int origin * n_states + state, so advancing the dot is +1.
+# Prediction is a table lookup keyed by the next token: for each nonterminal, the
+# start states of every rule reachable through leftmost derivations that can begin
+# with that token or derive nothing. Nullable symbols are stepped over when predicted
+# (Aycock-Horspool), so a completion never has to revisit the set it completes in.
+#
+# Each item keeps its packed alternatives (k, X): the same rule one dot earlier ended
+# at k, then X spans k..j. Together with the completed (A, origin) entries this is a
+# binarised shared packed forest, cubic in size however many trees it holds; trees,
+# counts and k-best lists are read off it on demand.
+class EarleyGrammar:
+    def __init__(self, cfg: CFG):
+        self.labels: List[str] = []
+        self.terminal: List[bool] = []
+        self._ids: Dict[object, int] = {}
+        self.start = self._symbol(cfg.start())
+        rules: List[Tuple[int, Tuple[int, ...]]] = []
+        self.rule_weight: List[float] = []                    # log-probability, 0.0 for a plain CFG
+        for prod in cfg.productions():
+            rules.append((self._symbol(prod.lhs()), tuple(self._symbol(x) for x in prod.rhs())))
+            self.rule_weight.append(prod.logprob() if hasattr(prod, "logprob") else 0.0)
+        n = self.n_symbols = len(self.labels)
+        self.token_ids = {self.labels[x]: x for x in range(n) if self.terminal[x]}
+
+        self.lhs: List[int] = []                              # state -> lhs symbol
+        self.next: List[int] = []                             # state -> symbol after the dot, -1 if complete
+        self.dot: List[int] = []
+        self.rule: List[int] = []
+        rule_start = []
+        for r, (a, rhs) in enumerate(rules):
+            rule_start.append(len(self.lhs))
+            for d in range(len(rhs) + 1):
+                self.lhs.append(a)
+                self.next.append(rhs[d] if d < len(rhs) else -1)
+                self.dot.append(d)
+                self.rule.append(r)
+        self.n_states = len(self.lhs)
+
+        self.nullable = [False] * n
+        changed = True
+        while changed:
+            changed = False
+            for a, rhs in rules:
+                if not self.nullable[a] and all(self.nullable[x] for x in rhs):
+                    self.nullable[a] = changed = True
+        # first[X] = bitset of terminals X can begin with
+        first = [1 << x if self.terminal[x] else 0 for x in range(n)]
+        changed = True
+        while changed:
+            changed = False
+            for a, rhs in rules:
+                f = first[a] | self._first(rhs, first)
+                if f != first[a]:
+                    first[a], changed = f, True
+        # reach[B] = bitset of nonterminals B =>* C ... leftmost, B included
+        left = [0] * n
+        for a, rhs in rules:
+            for x in rhs:
+                if not self.terminal[x]:
+                    left[a] |= 1 << x
+                if not self.nullable[x]:
+                    break
+        self.reach = [0] * n
+        for b in range(n):
+            seen, stack = 1 << b, [b]
+            while stack:
+                for c in _bits(left[stack.pop()] & ~seen):
+                    seen |= 1 << c
+                    stack.append(c)
+            self.reach[b] = seen
+
+        # predict[B][token id] = start states to add when B is predicted before that token;
+        # key -1 is the end of the input, where only rules deriving nothing can help
+        self.predict: List[Dict[int, Tuple[int, ...]]] = [{} for _ in range(n)]
+        for b in range(n):
+            if self.terminal[b]:
+                continue
+            by_tok: Dict[int, List[int]] = {}
+            empty: List[int] = []
+            for r, (a, rhs) in enumerate(rules):
+                if not self.reach[b] >> a & 1:
+                    continue
+                for t in _bits(self._first(rhs, first)):
+                    by_tok.setdefault(t, []).append(rule_start[r])
+                if all(self.nullable[x] for x in rhs):
+                    empty.append(rule_start[r])
+            if empty:
+                for t in self.token_ids.values():
+                    by_tok[t] = by_tok.get(t, []) + empty
+            by_tok[-1] = empty
+            self.predict[b] = {t: tuple(states) for t, states in by_tok.items()}
+
+    def _symbol(self, key) -> int:
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self.labels)
+            terminal = not isinstance(key, Nonterminal)
+            self.labels.append(key if terminal else key.symbol())
+            self.terminal.append(terminal)
+        return i
+
+    def _first(self, rhs: Sequence[int], first: List[int]) -> int:
+        out = 0
+        for x in rhs:
+            out |= first[x]
+            if not self.nullable[x]:
+                break
+        return out
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def _top_pairs(left: list, right: list, k: int) -> list:
+    """Up to k best (score, children + (child,)) combinations of two score-sorted lists."""
+    if not left or not right:
+        return []
+    out, seen = [], {(0, 0)}
+    heap = [(-(left[0][0] + right[0][0]), 0, 0)]
+    while heap and len(out) < k:
+        neg, a, b = heapq.heappop(heap)
+        out.append((-neg, left[a][1] + (right[b][1],)))
+        for na, nb in ((a + 1, b), (a, b + 1)):
+            if na < len(left) and nb < len(right) and (na, nb) not in seen:
+                seen.add((na, nb))
+                heapq.heappush(heap, (-(left[na][0] + right[nb][0]), na, nb))
+    return out
+
+class Forest:
+    """Shared packed forest of one sentence; nothing is enumerated until asked for."""
+    def __init__(self, g: EarleyGrammar, tokens: Sequence[str], alts: List[dict], done: List[dict]):
+        self.g = g
+        self.tokens = list(tokens)
+        self.alts = alts                                      # alts[j][item] = [(k, X)]
+        self.done = done                                      # done[j][origin * n_symbols + A] = [states]
+        self._memo: Dict[Tuple, object] = {}
+
+    def accepts(self) -> bool:
+        return self.g.start in self.done[len(self.tokens)]
+
+    def _sym_states(self, a: int, i: int, j: int) -> List[int]:
+        return self.done[j].get(i * self.g.n_symbols + a, [])
+
+    def _item_alts(self, s: int, i: int, j: int) -> List[Tuple[int, int]]:
+        return self.alts[j][i * self.g.n_states + s]
+
+    def count(self) -> int:
+        """Number of trees, without building any; cycles through empty or unit rules count once."""
+        return self._count_sym(self.g.start, 0, len(self.tokens), set())
+
+    def _count_sym(self, a: int, i: int, j: int, active: set) -> int:
+        key = ("n", a, i, j)
+        if key in self._memo:
+            return self._memo[key]
+        if key in active:
+            return 0
+        active.add(key)
+        total = sum(self._count_item(s, i, j, active) for s in self._sym_states(a, i, j))
+        active.discard(key)
+        self._memo[key] = total
+        return total
+
+    def _count_item(self, s: int, i: int, j: int, active: set) -> int:
+        if self.g.dot[s] == 0:
+            return 1
+        total = 0
+        for k, x in self._item_alts(s, i, j):
+            right = 1 if self.g.terminal[x] else self._count_sym(x, k, j, active)
+            if right:
+                total += self._count_item(s - 1, i, k, active) * right
+        return total
+
+    def trees(self) -> Iterator[Tree]:
+        """Every tree, built lazily one at a time."""
+        yield from self._sym_trees(self.g.start, 0, len(self.tokens), frozenset())
+
+    def _sym_trees(self, a: int, i: int, j: int, active: frozenset) -> Iterator[Tree]:
+        key = (a, i, j)
+        if key in active:
+            return
+        active = active | {key}
+        for s in self._sym_states(a, i, j):
+            for children in self._item_children(s, i, j, active):
+                yield Tree(self.g.labels[a], list(children))
+
+    def _item_children(self, s: int, i: int, j: int, active: frozenset) -> Iterator[tuple]:
+        if self.g.dot[s] == 0:
+            yield ()
+            return
+        for k, x in self._item_alts(s, i, j):
+            for left in self._item_children(s - 1, i, k, active):
+                if self.g.terminal[x]:
+                    yield left + (self.tokens[k],)
+                else:
+                    for right in self._sym_trees(x, k, j, active):
+                        yield left + (right,)
+
+    def best(self, k: int) -> List[Tuple[float, Tree]]:
+        """The k highest-scoring trees with their log-probabilities (0.0 per rule for a plain CFG,
+        so the first k in forest order)."""
+        self._memo = {key: v for key, v in self._memo.items() if key[0] == "n"}
+        found = self._best_sym(self.g.start, 0, len(self.tokens), k, set())
+        return [(score, tree.copy(deep=True)) for score, tree in found]
+
+    def _best_sym(self, a: int, i: int, j: int, k: int, active: set) -> list:
+        key = ("b", a, i, j)
+        if key in self._memo:
+            return self._memo[key]
+        if key in active:
+            return []
+        active.add(key)
+        g, cands = self.g, []
+        for s in self._sym_states(a, i, j):
+            w = g.rule_weight[g.rule[s]]
+            for score, children in self._best_item(s, i, j, k, active):
+                cands.append((score + w, children))
+        out = [(score, Tree(g.labels[a], list(children)))
+               for score, children in heapq.nlargest(k, cands, key=lambda c: c[0])]
+        active.discard(key)
+        self._memo[key] = out
+        return out
+
+    def _best_item(self, s: int, i: int, j: int, k: int, active: set) -> list:
+        if self.g.dot[s] == 0:
+            return [(0.0, ())]
+        key = ("i", s, i, j)
+        if key in self._memo:
+            return self._memo[key]
+        cands = []
+        for kk, x in self._item_alts(s, i, j):
+            right = [(0.0, self.tokens[kk])] if self.g.terminal[x] else self._best_sym(x, kk, j, k, active)
+            cands += _top_pairs(self._best_item(s - 1, i, kk, k, active), right, k)
+        out = heapq.nlargest(k, cands, key=lambda c: c[0])
+        self._memo[key] = out
+        return out
+
+class EarleyParser:
+    """Earley parser over a grammar compiled once; per-set chart containers are kept
+    and cleared between sentences rather than reallocated."""
+    def __init__(self, cfg: CFG):
+        self.grammar = EarleyGrammar(cfg)
+        self._alts: List[dict] = []
+        self._done: List[dict] = []
+        self._waiting: List[dict] = []                        # waiting[j][B] = items in set j before B
+
+    def _fill(self, tokens: Sequence[str]) -> int:
+        g = self.grammar
+        ids = [g.token_ids.get(t) for t in tokens]
+        missing = [t for t, x in zip(tokens, ids) if x is None]
+        if missing:
+            raise ValueError("Grammar does not cover some of the input words: %s." %
+                             ", ".join(repr(t) for t in missing))
+        n = len(tokens)
+        while len(self._alts) <= n:
+            self._alts.append({})
+            self._done.append({})
+            self._waiting.append({})
+        alts, done, waiting = self._alts, self._done, self._waiting
+        for j in range(n + 1):
+            alts[j].clear()
+            done[j].clear()
+            waiting[j].clear()
+
+        S, NS = g.n_states, g.n_symbols
+        lhs, nxt, terminal, nullable = g.lhs, g.next, g.terminal, g.nullable
+        predict, reach = g.predict, g.reach
+        for s in predict[g.start].get(ids[0] if n else -1, ()):
+            alts[0][s] = []
+        for j in range(n + 1):
+            cur, cur_done, cur_wait = alts[j], done[j], waiting[j]
+            tok = ids[j] if j < n else -1
+            predicted = reach[g.start] if j == 0 else 0
+            agenda = list(cur)
+            while agenda:
+                key = agenda.pop()
+                i, s = divmod(key, S)
+                x = nxt[s]
+                if x < 0:
+                    dk = i * NS + lhs[s]
+                    states = cur_done.get(dk)
+                    if states is not None:
+                        states.append(s)
+                        continue
+                    cur_done[dk] = [s]
+                    if i == j:                                # already stepped over as nullable
+                        continue
+                    a = lhs[s]
+                    for w in waiting[i].get(a, ()):
+                        alt = cur.get(w + 1)
+                        if alt is None:
+                            cur[w + 1] = [(i, a)]
+                            agenda.append(w + 1)
+                        else:
+                            alt.append((i, a))
+                elif terminal[x]:
+                    if x == tok:
+                        alts[j + 1][key + 1] = [(j, x)]
+                else:
+                    w = cur_wait.get(x)
+                    if w is None:
+                        cur_wait[x] = [key]
+                    else:
+                        w.append(key)
+                    if not predicted >> x & 1:
+                        predicted |= reach[x]
+                        base = j * S
+                        for ps in predict[x].get(tok, ()):
+                            if base + ps not in cur:
+                                cur[base + ps] = []
+                                agenda.append(base + ps)
+                    if nullable[x]:
+                        alt = cur.get(key + 1)
+                        if alt is None:
+                            cur[key + 1] = [(j, x)]
+                            agenda.append(key + 1)
+                        else:
+                            alt.append((j, x))
+        return n
+
+    def forest(self, tokens: Sequence[str]) -> Forest:
+        """Shared packed forest for tokens; it owns its chart, so it outlives later parses."""
+        n = self._fill(tokens)
+        f = Forest(self.grammar, tokens, self._alts[:n + 1], self._done[:n + 1])
+        self._alts[:n + 1] = [{} for _ in range(n + 1)]
+        self._done[:n + 1] = [{} for _ in range(n + 1)]
+        return f
+
+    def _scratch(self, tokens: Sequence[str]) -> Forest:
+        n = self._fill(tokens)
+        return Forest(self.grammar, tokens, self._alts[:n + 1], self._done[:n + 1])
+
+    def count(self, tokens: Sequence[str]) -> int:
+        """Number of parses; the chart is reused by the next sentence."""
+        return self._scratch(tokens).count()
+
+    def best(self, tokens: Sequence[str], k: int) -> List[Tuple[float, Tree]]:
+        return self._scratch(tokens).best(k)
+
+    def parse(self, tokens: Sequence[str]) -> Iterator[Tree]:
+        return self.forest(tokens).trees()
+
+def conj_sentence(n_conj: int) -> List[str]:
+    clauses = [["the", "dog", "sees", "the", "cat"], ["a", "cat", "runs"], ["dog", "sees", "park"]]
+    words = list(clauses[0])
+    for i in range(n_conj):
+        words += ["and"] + clauses[(i + 1) % len(clauses)]
+    return words
+
+def _measure(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+def bench(conjs: Sequence[int] = (1, 2, 3, 5, 8, 10, 15, 20), nltk_budget: float = 30.0, k: int = 10):
+    ours, theirs = EarleyParser(grammar), EarleyChartParser(grammar)
+    print(f"{'conj':>4} {'tokens':>6} {'parses':>14} {'NLTK chart':>19} {'NLTK all':>9} "
+          f"{'forest':>19} {'count':>8} {f'best-{k}':>8}")
+    nltk_on = all_on = True
+    for c in conjs:
+        tokens = conj_sentence(c)
+        forest, t_forest, m_forest = _measure(lambda: ours.forest(tokens))
+        t0 = time.perf_counter()
+        n_parses = forest.count()
+        t_count = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        top = ours.best(tokens, k)
+        t_best = time.perf_counter() - t0
+        assert len(top) == min(k, n_parses)
+        chart_cell = all_cell = "-"
+        if nltk_on:
+            _, t_chart, m_chart = _measure(lambda: theirs.chart_parse(tokens))
+            chart_cell = f"{t_chart:7.3f}s {m_chart / 2**20:7.1f}MB"
+            nltk_on = t_chart < nltk_budget / 10
+        if all_on:
+            t0 = time.perf_counter()
+            try:
+                expected = list(theirs.parse(tokens))
+            except ValueError:                                # NLTK's cap on extracted tree nodes
+                expected, all_on = None, False
+                all_cell = "refused"
+            t_all = time.perf_counter() - t0
+            if expected is not None:
+                assert sorted(map(str, expected)) == sorted(map(str, forest.trees()))
+                all_cell = f"{t_all:8.3f}s"
+                all_on = t_all < nltk_budget / 10
+        print(f"{c:>4} {len(tokens):>6} {n_parses:>14,} {chart_cell:>19} {all_cell:>9} "
+              f"{t_forest:7.3f}s {m_forest / 2**20:7.1f}MB {t_count:7.3f}s {t_best:7.3f}s")
+
+    sents = [conj_sentence(i % 6) for i in range(500)]
+    t0 = time.perf_counter()
+    for tokens in sents:
+        ours.count(tokens)
+    reused = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for tokens in sents:
+        EarleyParser(grammar).count(tokens)
+    fresh = time.perf_counter() - t0
+    print(f"{len(sents)} sentences counted: {len(sents) / reused:,.0f} sents/s on one parser, "
+          f"{len(sents) / fresh:,.0f} sents/s compiling per sentence")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit()
+
+    parser = EarleyChartParser(grammar)
+    sentence = "the dog sees the cat and the cat runs"
+    for tree in parser.parse(sentence.split()):
+        print(tree)
+
+    earley = EarleyParser(grammar)
+    for tree in earley.parse(sentence.split()):
+        print(tree)
+    print("parses:", earley.count(sentence.split()))
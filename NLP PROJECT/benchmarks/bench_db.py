@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# bench_db.py
+# Ops/sec for alert inserts and chat turns: per-call connections (old behaviour) vs the pooled layer.
+# Usage: python benchmarks/bench_db.py [--alerts 10000] [--turns 10000]
+#        python benchmarks/bench_db.py --check   # cache freshness, no connections leaked by refits
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import smart_fraud_chatbot as sfc  # noqa: E402
+
+CHAT_SCRIPT = [
+    "why was I flagged?",
+    "list my cases",
+    "status of case 1",
+    "report fraud: card used abroad",
+    "help",
+]
+
+class PerCallPool(sfc.ConnectionPool):
+    """Baseline: a fresh connection, default pragmas and a commit for every helper call."""
+    def connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    @contextmanager
+    def unit_of_work(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+def run_alerts(n: int, batched: bool) -> float:
+    alerts = [sfc.FraudAlert(user_id="bench_user", txn_id=f"TXN-{i}", reason="new device", score=-0.6)
+              for i in range(n)]
+    t0 = time.perf_counter()
+    if batched:
+        with sfc.POOL.unit_of_work():
+            for a in alerts:
+                sfc.db_insert_alert(a)
+    else:
+        for a in alerts:
+            sfc.db_insert_alert(a)
+    return n / (time.perf_counter() - t0)
+
+def run_turns(n: int) -> float:
+    system = sfc.SmartFraudSystem(user_id="bench_user")
+    t0 = time.perf_counter()
+    for i in range(n):
+        system.handle_input(CHAT_SCRIPT[i % len(CHAT_SCRIPT)])
+    return n / (time.perf_counter() - t0)
+
+def bench(label: str, pool_cls, n_alerts: int, n_turns: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        sfc.db_configure(path)
+        sfc.POOL = pool_cls(path)
+        sfc.db_init()
+        per_call = run_alerts(n_alerts, batched=False)
+        one_tx = run_alerts(n_alerts, batched=True)
+        turns = run_turns(n_turns)
+        sfc.POOL.close_all()
+    print(f"{label:<10} alerts/s (per call) {per_call:>10.0f} | "
+          f"alerts/s (one unit) {one_tx:>10.0f} | chat turns/s {turns:>8.0f}")
+
+def check_external_writes():
+    """Commits from a second connection (standing in for another process) reach cached lookups."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "check.db")
+        sfc.db_configure(path)
+        sfc.db_init()
+        system = sfc.SmartFraudSystem(user_id="check_user")
+        assert "all clear" in system.handle_input("why was I flagged?")
+        case_id = sfc.db_create_case("check_user", "card used abroad")
+        assert "open" in system.handle_input(f"status of case {case_id}")
+        assert sfc.LOOKUP_CACHE.stats()["size"] == 2
+
+        other = sqlite3.connect(path)
+        with other:
+            other.execute(sfc.SQL_INSERT_ALERT, ("TXN-EXT", "check_user", "new device", -0.7))
+            other.execute(sfc.SQL_UPDATE_CASE_STATUS, ("closed", case_id))
+        other.close()
+        time.sleep(sfc.EXTERNAL_CHECK_INTERVAL)
+        reply = system.handle_input("why was I flagged?")
+        assert "TXN-EXT" in reply, reply
+        reply = system.handle_input(f"status of case {case_id}")
+        assert "closed" in reply, reply
+        # Writes from this process's other pooled connections invalidate precisely;
+        # clearing everything is rate-limited
+        clears = sfc.LOOKUP_CACHE.stats()["external_clears"]
+        writer = ThreadPoolExecutor(1)
+        t0 = time.perf_counter()
+        for i in range(200):
+            writer.submit(sfc.db_create_case, "check_user", f"case {i}").result()
+            system.handle_input("why was I flagged?")
+            system.handle_input("list my cases")
+        cleared = sfc.LOOKUP_CACHE.stats()["external_clears"] - clears
+        assert cleared <= 1 + (time.perf_counter() - t0) / sfc.EXTERNAL_CHECK_INTERVAL, cleared
+        assert f"case {i}" in system.handle_input("list my cases")
+        writer.shutdown()
+        sfc.POOL.close_all()
+    print("external writes ok")
+
+def check_refit_connections():
+    """Background refits run on short-lived threads and must not leave their connections open."""
+    with tempfile.TemporaryDirectory() as tmp:
+        sfc.db_configure(os.path.join(tmp, "check.db"))
+        sfc.db_init()
+        system = sfc.SmartFraudSystem(user_id="check_user", store=sfc.ModelStore(os.path.join(tmp, "models")))
+        system.ingest_and_detect()
+        before = len(sfc.POOL._conns)
+        for _ in range(5):
+            system.schedule_refit()
+            system.wait_for_refit()
+        assert len(sfc.POOL._conns) == before, (before, len(sfc.POOL._conns))
+        sfc.POOL.close_all()
+    print("refit connections ok")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--alerts", type=int, default=10_000)
+    ap.add_argument("--turns", type=int, default=10_000)
+    ap.add_argument("--check", action="store_true",
+                    help="only check cache freshness and that refits release their connections")
+    args = ap.parse_args()
+    if args.check:
+        check_external_writes()
+        check_refit_connections()
+        return
+    bench("before", PerCallPool, args.alerts, args.turns)
+    bench("after", sfc.ConnectionPool, args.alerts, args.turns)
+
+if __name__ == "__main__":
+    main()
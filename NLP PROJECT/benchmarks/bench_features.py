@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# bench_features.py
+# Load time and peak memory for one user's model features:
+# pd.read_sql_query + column selection (old path) vs db_load_features (typed arrays).
+# Each load runs in a fresh process so its peak RSS is measured in isolation.
+# Usage: python benchmarks/bench_features.py [--rows 1000000 10000000]
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import smart_fraud_chatbot as sfc  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+
+USER = "bench_user"
+
+def populate(n_rows: int):
+    conn = sfc.POOL.connection()
+    with sfc.POOL.unit_of_work():
+        for chunk in synthetic_history(n_rows, [USER], chunk=100_000):
+            conn.executemany(sfc.SQL_INSERT_TRANSACTION, [
+                (t.txn_id, t.user_id, t.amount, t.location_code, t.hour_of_day, t.device_new) for t in chunk
+            ])
+
+def via_dataframe(conn):
+    df = sfc.db_load_transactions(conn, USER)
+    return sfc.feature_matrix(df)
+
+def via_features(conn):
+    return sfc.db_load_features(conn, USER).X
+
+LOADERS = {"dataframe": via_dataframe, "features": via_features}
+
+def load_in_child(db_path: str, label: str):
+    """Runs in a fresh process: (seconds, peak RSS growth in bytes, checksum of the matrix)."""
+    sfc.db_configure(db_path)
+    conn = sfc.POOL.connection()
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    X = LOADERS[label](conn)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    return elapsed, peak * 1024, float(X.astype("float64").sum()), X.nbytes
+
+def measure(db_path: str, label: str):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(load_in_child, db_path, label).result()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    args = ap.parse_args()
+
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            sfc.db_configure(db_path)
+            sfc.db_init()
+            populate(n_rows)
+            sfc.POOL.close_all()
+            print(f"{n_rows:,} rows")
+            checksums = set()
+            for label in LOADERS:
+                try:
+                    elapsed, peak, checksum, nbytes = measure(db_path, label)
+                except BrokenProcessPool:
+                    print(f"  {label:<10} worker died (out of memory?)")
+                    continue
+                checksums.add(checksum)
+                print(f"  {label:<10} {elapsed:7.2f}s  peak +{peak / 2**20:8.1f} MiB  matrix {nbytes / 2**20:6.1f} MiB")
+            assert len(checksums) <= 1, checksums
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# bench_intents.py
+# Sequential per-intent regexes (the old handle_input path) vs the single-pass IntentEngine
+# on long and adversarial messages. Time per character should stay flat for the engine.
+# Usage: python benchmarks/bench_intents.py [--sizes 1000 4000 16000]
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import smart_fraud_chatbot as sfc  # noqa: E402
+
+PRIORITY = ["exit", "why_flagged", "report_fraud", "check_status", "list_cases", "help"]
+CASE_ID = re.compile(r"(case\s*#?\s*)(\d+)", re.I)
+REPORT_DESC = re.compile(r"report.*?:?\s*(.*)", re.I)
+
+def sequential(text: str):
+    intent = next((name for name in PRIORITY if sfc.INTENT_PATTERNS[name].search(text)), None)
+    if intent == "report_fraud":
+        REPORT_DESC.search(text)
+    elif intent == "check_status":
+        CASE_ID.search(text)
+    return intent
+
+INPUTS = {
+    "long chat": lambda n: ("my card was used somewhere odd and I am worried " * (n // 48 + 1))[:n] + " list my cases",
+    "why, no flag": lambda n: "why " * (n // 4),
+    "status, no id": lambda n: "status track progress " * (n // 22),
+    "case + spaces": lambda n: "case" + " " * n,
+    "report spam": lambda n: "report raise " * (n // 13) + "fraud",
+}
+
+def per_char_ns(fn, text: str, budget: float = 0.2) -> float:
+    reps, elapsed = 0, 0.0
+    t0 = time.perf_counter()
+    while elapsed < budget:
+        fn(text)
+        reps += 1
+        elapsed = time.perf_counter() - t0
+    return elapsed / reps / max(1, len(text)) * 1e9
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000])
+    args = ap.parse_args()
+    engine = sfc.INTENT_ENGINE
+    print(f"{'input':<15}{'chars':>8}{'sequential ns/char':>22}{'engine ns/char':>18}")
+    for name, make in INPUTS.items():
+        for n in args.sizes:
+            text = make(n)
+            assert sequential(text) == engine.classify(text).intent, name
+            print(f"{name:<15}{len(text):>8}{per_char_ns(sequential, text):>22.1f}"
+                  f"{per_char_ns(engine.classify, text):>18.1f}")
+
+    batch = [make(200) for make in INPUTS.values()] * 2000
+    t0 = time.perf_counter()
+    engine.classify_many(batch)
+    print(f"\nclassify_many: {len(batch) / (time.perf_counter() - t0):,.0f} messages/s (200-char messages)")
+
+if __name__ == "__main__":
+    main()
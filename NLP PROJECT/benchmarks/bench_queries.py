@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# bench_queries.py
+# Hot-query latency on a large fraud DB, before (schema v1) and after (latest) the index migration.
+# Also checks EXPLAIN QUERY PLAN so a hot query never falls back to a full table scan.
+# Usage: python benchmarks/bench_queries.py [--rows 1000000 10000000] [--rows-per-user 1000]
+#        python benchmarks/bench_queries.py --check   # plan check only, on a small seeded DB
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import smart_fraud_chatbot as sfc  # noqa: E402
+
+HOT_QUERIES = {
+    "latest_alert": (sfc.SQL_LATEST_ALERT, lambda u, w: (u,)),
+    "list_cases": (sfc.SQL_LIST_CASES, lambda u, w: (u,)),
+    "case_status": (sfc.SQL_CASE_STATUS, lambda u, w: (1, u)),
+    "delta_txns": (sfc.SQL_USER_TRANSACTIONS_SINCE, lambda u, w: (u, w)),
+}
+
+# Index each hot query must search through at the latest schema version
+HOT_QUERY_INDEXES = {
+    "latest_alert": "USING INDEX idx_alerts_user_created",
+    "list_cases": "USING INDEX idx_cases_user_case",
+    "case_status": "USING INTEGER PRIMARY KEY",
+    "delta_txns": "USING INDEX idx_transactions_user",
+}
+CHECK_ROWS = 5_000
+
+def populate(n_rows: int, rows_per_user: int, seed: int = 42):
+    rng = random.Random(seed)
+    n_users = max(1, n_rows // rows_per_user)
+    conn = sfc.POOL.connection()
+    with sfc.POOL.unit_of_work():
+        conn.executemany(sfc.SQL_INSERT_TRANSACTION, (
+            (f"TXN-{i}", f"user_{i % n_users:07d}", rng.gauss(800, 200), rng.choice((1, 1, 1, 2)),
+             rng.randrange(24), 0) for i in range(n_rows)
+        ))
+        conn.executemany(sfc.SQL_INSERT_ALERT, (
+            (f"TXN-{i}", f"user_{i % n_users:07d}", "new device", -0.6) for i in range(0, n_rows, 10)
+        ))
+        conn.executemany(sfc.SQL_INSERT_CASE, (
+            (f"user_{i % n_users:07d}", "suspected fraud", "open") for i in range(0, n_rows, 100)
+        ))
+    return n_users
+
+def time_queries(n_users: int, n_rows: int, samples: int, seed: int = 7):
+    rng = random.Random(seed)
+    conn = sfc.POOL.connection()
+    watermark = n_rows - 10 * n_users   # leaves each user's last ~10 rows unscored
+    out = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        users = [f"user_{rng.randrange(n_users):07d}" for _ in range(samples)]
+        t0 = time.perf_counter()
+        for u in users:
+            conn.execute(sql, params(u, watermark)).fetchall()
+        out[name] = (time.perf_counter() - t0) / samples * 1000
+    return out
+
+def check_plans():
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = sfc.db_explain(sql, params("user_0000000", 0))
+        assert not any(step.startswith("SCAN") or "TEMP B-TREE" in step for step in plan), (name, plan)
+        assert any(HOT_QUERY_INDEXES[name] in step for step in plan), (name, plan)
+        print(f"  plan {name:<13} {' | '.join(plan)}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--rows-per-user", type=int, default=1000)
+    ap.add_argument("--samples", type=int, default=200)
+    ap.add_argument("--check", action="store_true", help="only check the query plans on a small seeded DB")
+    args = ap.parse_args()
+
+    if args.check:
+        with tempfile.TemporaryDirectory() as tmp:
+            sfc.db_configure(os.path.join(tmp, "check.db"))
+            sfc.db_migrate()
+            populate(CHECK_ROWS, min(args.rows_per_user, CHECK_ROWS // 10))
+            check_plans()
+            sfc.POOL.close_all()
+        print("plans ok")
+        return
+
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            sfc.db_configure(os.path.join(tmp, "bench.db"))
+            sfc.db_migrate(target=1)
+            t0 = time.perf_counter()
+            n_users = populate(n_rows, args.rows_per_user)
+            print(f"{n_rows:,} rows / {n_users:,} users (populated in {time.perf_counter() - t0:.1f}s)")
+
+            # Unindexed scans are slow at this size; sample fewer lookups
+            before = time_queries(n_users, n_rows, max(1, args.samples // 20))
+            t0 = time.perf_counter()
+            sfc.db_migrate()
+            print(f"  migration to v{sfc.SCHEMA_VERSION}: {time.perf_counter() - t0:.1f}s")
+            after = time_queries(n_users, n_rows, args.samples)
+            check_plans()
+            for name in HOT_QUERIES:
+                print(f"  {name:<13} before {before[name]:>10.3f} ms   after {after[name]:>8.3f} ms")
+            sfc.POOL.close_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# bench_stream.py
+# Throughput (records/sec) and batch latency percentiles for StreamDetector,
+# fed by seeded synthetic rows; every chunk of the stream is new data.
+# Usage: python benchmarks/bench_stream.py [--records 200000] [--users 50] [--batch-size 500] [--seed 42]
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+from typing import Iterator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import smart_fraud_chatbot as sfc  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+
+def synthetic_stream(n_users: int, seed: int, chunk: int = 200) -> Iterator[sfc.Transaction]:
+    """Endless round-robin over users, `chunk` rows at a time, each chunk drawn from its own start offset."""
+    user_ids = [f"user_{u:05d}" for u in range(n_users)]
+    for start in itertools.count(0, chunk):
+        for rows in synthetic_history(chunk, [user_ids[start // chunk % n_users]], seed=seed, start=start):
+            yield from rows
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=200_000)
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--batch-size", type=int, default=sfc.STREAM_BATCH_SIZE)
+    ap.add_argument("--seed", type=int, default=sfc.RANDOM_SEED)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sfc.db_configure(os.path.join(tmp, "bench.db"))
+        sfc.db_init()
+        detector = sfc.StreamDetector(store=sfc.ModelStore(os.path.join(tmp, "models")),
+                                      batch_size=args.batch_size)
+        records = itertools.islice(synthetic_stream(args.users, args.seed), args.records)
+
+        latencies, n_alerts, n_records = [], 0, 0
+        t0 = time.perf_counter()
+        for batch in sfc.micro_batches(records, args.batch_size):
+            b0 = time.perf_counter()
+            n_alerts += len(detector.process_batch(batch))
+            latencies.append(time.perf_counter() - b0)
+            n_records += len(batch)
+        elapsed = time.perf_counter() - t0
+        detector.close()
+        sfc.POOL.close_all()
+
+    print(f"records       {n_records}")
+    print(f"alerts        {n_alerts}")
+    print(f"records/sec   {n_records / elapsed:,.0f}")
+    print(f"batch p50 ms  {percentile(latencies, 0.50) * 1000:.1f}")
+    print(f"batch p99 ms  {percentile(latencies, 0.99) * 1000:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# bench_system.py
+# End-to-end SmartFraudSystem benchmark over seeded synthetic histories:
+# ingest throughput, cold/warm detection time, alert persistence and chat-turn
+# latency per intent. Results are written as JSON so runs can be diffed across commits.
+# Usage: python benchmarks/bench_system.py [--sizes 1000 100000 1000000] [--turns 200] [--out bench_system.json]
+#        python benchmarks/bench_system.py --check   # stage timing switched on after import
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+import sklearn
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import smart_fraud_chatbot as sfc  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+
+USER = "bench_user"
+CHAT_TURNS = {
+    "why_flagged": "why was I flagged?",
+    "report_fraud": "report fraud: card used abroad",
+    "check_status": "status of case 1",
+    "list_cases": "list my cases",
+    "help": "help",
+    "fallback": "hello there",
+}
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples)
+    return {"n": len(arr), "mean_ms": float(arr.mean() * 1e3),
+            "p50_ms": float(np.percentile(arr, 50) * 1e3), "p99_ms": float(np.percentile(arr, 99) * 1e3),
+            "max_ms": float(arr.max() * 1e3)}
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+def bench_ingest(n_rows: int, seed: int) -> Dict[str, float]:
+    elapsed = 0.0
+    for chunk in synthetic_history(n_rows, [USER], seed=seed):
+        _, dt = timed(sfc.db_insert_transactions, chunk)
+        elapsed += dt
+    return {"rows": n_rows, "seconds": elapsed, "rows_per_sec": n_rows / elapsed}
+
+def bench_detect(system: sfc.SmartFraudSystem, n_rows: int, seed: int) -> Dict[str, Dict[str, float]]:
+    # detect(), not ingest_and_detect(): the latter adds simulated rows with time-based IDs
+    (df, alerts), cold = timed(system.detect)
+    cold_stats = {"rows": len(df), "alerts": len(alerts), "seconds": cold}
+
+    # Warm path: a delta past the model's watermark, scored with the persisted model
+    n_delta = max(100, n_rows // 100)
+    for chunk in synthetic_history(n_delta, [USER], seed=seed, start=n_rows):
+        sfc.db_insert_transactions(chunk)
+    (df, alerts), warm = timed(system.detect)
+    system.wait_for_refit()
+    return {"cold": cold_stats, "warm": {"rows": len(df), "alerts": len(alerts), "seconds": warm}}
+
+def bench_alerts(n_alerts: int) -> Dict[str, float]:
+    alerts = [sfc.FraudAlert(user_id=USER, txn_id=f"TXN-A{i}", reason="new device", score=-0.6)
+              for i in range(n_alerts)]
+    _, dt = timed(sfc.db_insert_alerts, alerts)
+    return {"alerts": n_alerts, "seconds": dt, "alerts_per_sec": n_alerts / dt}
+
+def bench_chat(system: sfc.SmartFraudSystem, turns: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for intent, text in CHAT_TURNS.items():
+        samples = []
+        for _ in range(turns):
+            _, dt = timed(system.handle_input, text)
+            samples.append(dt)
+        results[intent] = latency_stats(samples)
+    return results
+
+def run_size(n_rows: int, seed: int, turns: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        sfc.db_configure(os.path.join(tmp, "bench.db"))
+        sfc.db_init()
+        sfc.LOOKUP_CACHE.clear()
+        sfc.METRICS.reset()
+        system = sfc.SmartFraudSystem(USER, store=sfc.ModelStore(os.path.join(tmp, "models")))
+        try:
+            result = {
+                "ingest": bench_ingest(n_rows, seed),
+                "detect": bench_detect(system, n_rows, seed),
+                "alert_persist": bench_alerts(max(1000, n_rows // 10)),
+                "chat": bench_chat(system, turns),
+                "stages": sfc.METRICS.snapshot(),
+            }
+        finally:
+            system.wait_for_refit()
+            sfc.POOL.close_all()
+    return result
+
+def environment(seed: int) -> Dict[str, str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {"commit": commit, "seed": seed, "python": platform.python_version(), "platform": platform.platform(),
+            "numpy": np.__version__, "sklearn": sklearn.__version__, "sqlite": sqlite3.sqlite_version}
+
+def check_metrics():
+    """Decorated stages are timed once METRICS is enabled at runtime, with their row counts."""
+    enabled = sfc.METRICS.enabled
+    sfc.METRICS.enabled = True
+    sfc.METRICS.reset()
+    try:
+        rows = sfc.simulate_transactions(USER, n=40, anomaly_boost=4)
+        stage = sfc.METRICS.snapshot()["simulate_transactions"]
+        assert stage["calls"] == 1 and stage["rows"] == len(rows) == 44, stage
+        sfc.METRICS.enabled = False
+        sfc.simulate_transactions(USER)
+        assert sfc.METRICS.snapshot()["simulate_transactions"]["calls"] == 1
+    finally:
+        sfc.METRICS.enabled = enabled
+        sfc.METRICS.reset()
+    print("metrics ok")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    ap.add_argument("--turns", type=int, default=200, help="chat turns per intent")
+    ap.add_argument("--seed", type=int, default=sfc.RANDOM_SEED)
+    ap.add_argument("--out", default="bench_system.json")
+    ap.add_argument("--check", action="store_true", help="only check runtime-enabled stage timing")
+    args = ap.parse_args()
+    if args.check:
+        check_metrics()
+        return
+
+    # Per-stage breakdowns come from the app's own instrumentation
+    sfc.METRICS.enabled = True
+    report = {"environment": environment(args.seed), "sizes": {}}
+    for n_rows in args.sizes:
+        result = report["sizes"][str(n_rows)] = run_size(n_rows, args.seed, args.turns)
+        detect = result["detect"]
+        print(f"{n_rows:>9} rows  ingest {result['ingest']['rows_per_sec']:>10,.0f} rows/s  "
+              f"cold detect {detect['cold']['seconds']:7.2f}s  warm detect {detect['warm']['seconds']:6.3f}s  "
+              f"alerts {result['alert_persist']['alerts_per_sec']:>10,.0f}/s")
+        for intent, st in result["chat"].items():
+            print(f"{'':>11}chat {intent:<14} p50 {st['p50_ms']:7.3f} ms  p99 {st['p99_ms']:7.3f} ms")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# load_chat.py
+# Load generator for the --serve chat server: replays scripted conversations over many
+# concurrent sessions and reports p50/p99 reply latency.
+# Usage: python benchmarks/load_chat.py [--sessions 1000] [--host H --port P]
+#        (without --port a server is started on a temporary database)
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHATBOT = os.path.join(HERE, "..", "smart_fraud_chatbot.py")
+
+SCRIPT = [
+    "why was I flagged?",
+    "report fraud: card used at an ATM I never visited",
+    "list my cases",
+    "status of case 1",
+    "help",
+    "bye",
+]
+
+async def session(host: str, port: int, user_id: str, latencies: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"{user_id}\n".encode())
+    for text in SCRIPT:
+        t0 = time.perf_counter()
+        writer.write(f"{text}\n".encode())
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - t0)
+        if reply["exit"]:
+            break
+    writer.close()
+    await writer.wait_closed()
+
+async def run(host: str, port: int, n_sessions: int, n_users: int):
+    latencies: list = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(session(host, port, f"user_{i % n_users:05d}", latencies)
+                           for i in range(n_sessions)))
+    return latencies, time.perf_counter() - t0
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=1000)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=None)
+    ap.add_argument("--db-threads", type=int, default=8)
+    args = ap.parse_args()
+
+    server = None
+    tmp = None
+    port = args.port
+    if port is None:
+        tmp = tempfile.TemporaryDirectory()
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, CHATBOT, "--serve", "--db", os.path.join(tmp.name, "load.db"),
+             "--host", args.host, "--port", str(port), "--db-threads", str(args.db_threads)],
+            stdout=subprocess.PIPE, text=True)
+        server.stdout.readline()  # "Serving fraud chatbot on ..."
+    try:
+        latencies, elapsed = asyncio.run(run(args.host, port, args.sessions, args.users))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            tmp.cleanup()
+
+    print(f"sessions      {args.sessions}")
+    print(f"turns         {len(latencies)}")
+    print(f"turns/sec     {len(latencies) / elapsed:,.0f}")
+    print(f"reply p50 ms  {percentile(latencies, 0.50) * 1000:.1f}")
+    print(f"reply p99 ms  {percentile(latencies, 0.99) * 1000:.1f}")
+
+if __name__ == "__main__":
+    main()
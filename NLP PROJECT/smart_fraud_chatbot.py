@@ -2,14 +2,31 @@
 # smart_fraud_chatbot.py
 # Single-file prototype: Fraud detection + NLP chatbot + SQLite case management
 
+import argparse
+import asyncio
+import atexit
+import cProfile
+import csv
+import functools
+import json
+import multiprocessing
 import os
+import pickle
 import re
 import sqlite3
+import threading
 import time
 import random
+import sys
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import closing, contextmanager, nullcontext
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 
@@ -19,6 +36,134 @@ from sklearn.ensemble import IsolationForest
 DB_PATH = "fraud_system.db"
 CONTAMINATION = 0.15  # % of data expected to be anomalous
 RANDOM_SEED = 42
+MAX_WARM_USERS = 1024  # SmartFraudSystems (and their models) kept in memory by streaming/serving
+
+# -----------------------------
+# Instrumentation
+# -----------------------------
+# FRAUD_METRICS=1 records per-stage latency histograms and row counts and prints a
+# summary to stderr at exit. FRAUD_CPROFILE=<path> also runs main() under cProfile.
+METRICS_ENV = "FRAUD_METRICS"
+CPROFILE_ENV = "FRAUD_CPROFILE"
+
+class StageStats:
+    __slots__ = ("calls", "total", "max", "rows", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.buckets: Dict[int, int] = {}   # log2(microseconds) -> calls
+
+    def add(self, seconds: float, rows: int):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        bucket = int(seconds * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound (seconds) of the histogram bucket holding quantile q."""
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= q * self.calls:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+class _Stage:
+    __slots__ = ("metrics", "name", "rows", "t0")
+
+    def __init__(self, metrics: "Metrics", name: str, rows: int):
+        self.metrics = metrics
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.t0, self.rows)
+
+class _NullStage:
+    """Shared no-op stage used while metrics are off; `.rows = n` is ignored."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+class Metrics:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageStats] = {}
+
+    def stage(self, name: str, rows: int = 0):
+        """Context manager timing one stage; set `.rows` on it when the count is known only afterwards."""
+        return _Stage(self, name, rows) if self.enabled else _NULL_STAGE
+
+    def timed(self, name: str):
+        """
+        Decorator form of stage(). `enabled` is checked on every call, so metrics
+        switched on after import still apply; len() of the result, if it has one,
+        is recorded as the row count.
+        """
+        def wrap(fn):
+            @functools.wraps(fn)
+            def timed_fn(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.stage(name) as stage:
+                    result = fn(*args, **kwargs)
+                    stage.rows = len(result) if hasattr(result, "__len__") else 0
+                return result
+            return timed_fn
+        return wrap
+
+    def record(self, name: str, seconds: float, rows: int = 0):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats()
+            stats.add(seconds, rows)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {"calls": st.calls, "total_s": st.total, "mean_s": st.total / st.calls,
+                       "p50_s": st.quantile(0.5), "p99_s": st.quantile(0.99), "max_s": st.max,
+                       "rows": st.rows}
+                for name, st in self._stages.items()
+            }
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        lines = [f"{'stage':<32}{'calls':>8}{'total s':>10}{'mean ms':>10}{'p50 ms':>9}"
+                 f"{'p99 ms':>9}{'max ms':>9}{'rows':>10}"]
+        for name, st in sorted(snap.items(), key=lambda kv: kv[1]["total_s"], reverse=True):
+            lines.append(f"{name:<32}{st['calls']:>8}{st['total_s']:>10.3f}{st['mean_s'] * 1e3:>10.2f}"
+                         f"{st['p50_s'] * 1e3:>9.2f}{st['p99_s'] * 1e3:>9.2f}{st['max_s'] * 1e3:>9.2f}"
+                         f"{st['rows']:>10}")
+        return "\n".join(lines)
+
+METRICS = Metrics(enabled=os.environ.get(METRICS_ENV, "") not in ("", "0"))
+if METRICS.enabled:
+    atexit.register(lambda: print(METRICS.summary(), file=sys.stderr))
 
 # -----------------------------
 # Data classes
@@ -32,6 +177,28 @@ class Transaction:
     device_new: int         # 0/1
     txn_id: str = ""
 
+@dataclass
+class TransactionFeatures:
+    """Columnar model input for one user: rowids plus an (n, 4) float32 matrix in FEATURE_COLUMNS order."""
+    user_id: str
+    row_id: np.ndarray      # int64
+    X: np.ndarray           # float32, C-contiguous: IsolationForest's own dtype, so it is never copied
+
+    def __len__(self) -> int:
+        return len(self.row_id)
+
+    def __getitem__(self, mask) -> "TransactionFeatures":
+        return TransactionFeatures(self.user_id, self.row_id[mask], self.X[mask])
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Column views keyed by feature name, as the reason rules expect."""
+        return {name: self.X[:, j] for j, name in enumerate(FEATURE_COLUMNS)}
+
+    @property
+    def max_row_id(self) -> int:
+        return int(self.row_id.max()) if len(self) else 0
+
 @dataclass
 class FraudAlert:
     user_id: str
@@ -49,13 +216,285 @@ class Case:
 # -----------------------------
 # Database helpers
 # -----------------------------
-def db_connect(path: str = DB_PATH) -> sqlite3.Connection:
-    return sqlite3.connect(path)
+# Pragmas applied once to every pooled connection. WAL lets readers proceed while a
+# writer commits, and synchronous=NORMAL is durable under WAL without an fsync per commit.
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=-20000;",      # ~20 MB page cache
+    "PRAGMA busy_timeout=5000;",
+)
+STATEMENT_CACHE_SIZE = 256  # sqlite3 reuses prepared statements keyed by SQL text
+EXTERNAL_CHECK_INTERVAL = 0.1  # seconds between process-wide checks for other connections' commits
 
-def db_init():
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.execute("""
+class ConnectionPool:
+    """
+    One long-lived SQLite connection per thread, reused across helper calls.
+    Writes go through unit_of_work(), which nests: only the outermost block
+    opens a transaction and commits, so a whole detection run or chat turn
+    costs a single commit.
+    """
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: List[sqlite3.Connection] = []
+        self._watch: Optional[sqlite3.Connection] = None   # only ever runs PRAGMA data_version
+        self._watch_lock = threading.Lock()
+        self._data_version: Optional[int] = None
+        self._next_check = 0.0
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are opened explicitly by unit_of_work().
+            # Each connection is used only by its own thread; close_all() may run elsewhere.
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            for pragma in DB_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.hooks = []
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        if self._local.depth == 0:
+            conn.execute("BEGIN;")
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                try:
+                    conn.execute("ROLLBACK;")
+                finally:
+                    self._run_hooks()
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            try:
+                conn.execute("COMMIT;")
+            finally:
+                self._run_hooks()
+
+    def changed_elsewhere(self) -> bool:
+        """
+        True if any other connection committed since the last check, and on the
+        first check, when nothing is known yet. One process-wide watch connection
+        asks PRAGMA data_version at most every EXTERNAL_CHECK_INTERVAL seconds; in
+        between, or while another thread is asking, this returns False. data_version
+        only says that something changed, not how often or through which connection,
+        so this process's own pooled writes count as well, at most once per interval.
+        """
+        if time.monotonic() < self._next_check or not self._watch_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._watch is None:
+                self._watch = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            version = self._watch.execute("PRAGMA data_version;").fetchone()[0]
+            changed, self._data_version = version != self._data_version, version
+            self._next_check = time.monotonic() + EXTERNAL_CHECK_INTERVAL
+            return changed
+        finally:
+            self._watch_lock.release()
+
+    def on_transaction_end(self, callback: Callable[[], None]):
+        """Run `callback` when this thread's outermost unit of work ends (immediately if none is open)."""
+        if getattr(self._local, "depth", 0) == 0:
+            callback()
+        else:
+            self._local.hooks.append(callback)
+
+    def _run_hooks(self):
+        hooks, self._local.hooks = self._local.hooks, []
+        for callback in hooks:
+            callback()
+
+    def release(self):
+        """Close and forget this thread's connection; short-lived threads call it before exiting."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        with self._lock:
+            self._conns = [c for c in self._conns if c is not conn]
+        self._local.conn = None
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+            self._watch, self._data_version, self._next_check = None, None, 0.0
+        self._local = threading.local()
+
+POOL = ConnectionPool()
+
+@contextmanager
+def read_transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """One snapshot across several SELECTs; joins the caller's transaction if one is open."""
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN;")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT;")
+
+def db_configure(path: str) -> ConnectionPool:
+    """Point every helper at a different database file (closes existing connections)."""
+    global POOL
+    POOL.close_all()
+    POOL = ConnectionPool(path)
+    return POOL
+
+# -----------------------------
+# Lookup cache
+# -----------------------------
+LOOKUP_CACHE_SIZE = 10_000  # cached (user, query) results across all users
+
+class LookupCache:
+    """
+    Read-through LRU for per-user lookups, keyed by (user_id, kind, arg).
+    The db write helpers invalidate a user's affected kinds once their unit of work
+    ends. A per-user generation counter drops loads that raced with a write, so a
+    result read before a commit is never cached after it. Commits by other
+    processes, e.g. a --stream or --detect-users run, are caught by
+    POOL.changed_elsewhere() and clear the whole cache; that check is rate-limited,
+    so such writes show up within EXTERNAL_CHECK_INTERVAL and cost at most one
+    clear per interval however many threads look things up.
+    """
+    def __init__(self, maxsize: int = LOOKUP_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, str, Any], Any]" = OrderedDict()
+        self._by_user: Dict[str, set] = {}
+        self._generation: Dict[str, int] = {}
+        self._epoch = 0                     # bumped by clear(), drops every in-flight load
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.external_clears = 0
+        _CACHES.add(self)
+
+    def get_or_load(self, user_id: str, kind: str, arg: Any, loader: Callable[[], Any]) -> Any:
+        key = (user_id, kind, arg)
+        if POOL.changed_elsewhere():
+            self.clear()
+            self.external_clears += 1
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+            generation = self._generation.get(user_id, 0), self._epoch
+        value = loader()
+        with self._lock:
+            if (self._generation.get(user_id, 0), self._epoch) == generation and self.maxsize > 0:
+                self._data[key] = value
+                self._by_user.setdefault(user_id, set()).add(key)
+                while len(self._data) > self.maxsize:
+                    old, _ = self._data.popitem(last=False)
+                    self._by_user[old[0]].discard(old)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, user_id: str, kinds: Tuple[str, ...]):
+        with self._lock:
+            self._generation[user_id] = self._generation.get(user_id, 0) + 1
+            keys = self._by_user.get(user_id, ())
+            for key in [k for k in keys if k[1] in kinds]:
+                del self._data[key]
+                keys.discard(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "invalidations": self.invalidations,
+                    "external_clears": self.external_clears}
+
+_CACHES: "weakref.WeakSet[LookupCache]" = weakref.WeakSet()
+LOOKUP_CACHE = LookupCache()
+
+def cache_invalidate(user_ids, *kinds: str):
+    """
+    Invalidate `kinds` for each user in every live cache: now, so the writer's own
+    unit of work reads its writes, and again when that unit commits or rolls back,
+    dropping anything other threads cached from the pre-commit state meanwhile.
+    """
+    user_ids = set(user_ids)
+    def invalidate():
+        for cache in list(_CACHES):
+            for user_id in user_ids:
+                cache.invalidate(user_id, kinds)
+    invalidate()
+    POOL.on_transaction_end(invalidate)
+
+SQL_INSERT_TRANSACTION = """
+INSERT OR REPLACE INTO transactions(txn_id,user_id,amount,location_code,hour_of_day,device_new)
+VALUES(?,?,?,?,?,?);
+"""
+SQL_INSERT_ALERT = "INSERT INTO alerts(txn_id,user_id,reason,score) VALUES(?,?,?,?);"
+SQL_INSERT_CASE = "INSERT INTO cases(user_id,description,status) VALUES(?,?,?);"
+SQL_UPDATE_CASE_STATUS = "UPDATE cases SET status=? WHERE case_id=?;"
+SQL_LATEST_ALERT = """
+SELECT txn_id, reason, score, created_at FROM alerts
+WHERE user_id = ?
+ORDER BY created_at DESC
+LIMIT 1;
+"""
+SQL_LIST_CASES = """
+SELECT case_id, user_id, description, status FROM cases
+WHERE user_id = ?
+ORDER BY case_id DESC;
+"""
+SQL_CASE_STATUS = "SELECT status FROM cases WHERE case_id=? AND user_id=?;"
+SQL_CASE_OWNER = "SELECT user_id FROM cases WHERE case_id=?;"
+SQL_USER_TRANSACTIONS = (
+    "SELECT rowid AS row_id, txn_id, user_id, amount, location_code, hour_of_day, device_new "
+    "FROM transactions WHERE user_id = ?;"
+)
+SQL_USER_TRANSACTIONS_SINCE = (
+    "SELECT rowid AS row_id, txn_id, user_id, amount, location_code, hour_of_day, device_new "
+    "FROM transactions WHERE user_id = ? AND rowid > ?;"
+)
+# Feature loading: size the arrays first, then read exactly that rowid window
+SQL_USER_FEATURE_EXTENT = "SELECT COUNT(*), MAX(rowid) FROM transactions WHERE user_id = ? AND rowid > ?;"
+SQL_USER_FEATURES = (
+    "SELECT rowid, amount, location_code, hour_of_day, device_new "
+    "FROM transactions WHERE user_id = ? AND rowid > ? AND rowid <= ?;"
+)
+SQL_TXN_IDS = "SELECT rowid, txn_id FROM transactions WHERE rowid IN ({});"
+FEATURE_FETCH_ROWS = 65536     # cursor rows converted per chunk
+FEATURE_ROW_DTYPE = np.dtype([("row_id", np.int64), ("amount", np.float64), ("location_code", np.float64),
+                              ("hour_of_day", np.float64), ("device_new", np.float64)])
+TXN_ID_LOOKUP_BATCH = 900      # below SQLite's oldest host-parameter limit (999)
+
+# Versioned schema: SCHEMA_MIGRATIONS[i] upgrades a database from version i to i+1.
+# The applied version is kept in PRAGMA user_version.
+SCHEMA_MIGRATIONS: List[Tuple[str, ...]] = [
+    # v1: base tables
+    ("""
     CREATE TABLE IF NOT EXISTS transactions(
         txn_id TEXT PRIMARY KEY,
         user_id TEXT,
@@ -65,8 +504,7 @@ def db_init():
         device_new INTEGER,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
-    """)
-    cur.execute("""
+    """, """
     CREATE TABLE IF NOT EXISTS alerts(
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         txn_id TEXT,
@@ -75,8 +513,7 @@ def db_init():
         score REAL,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
-    """)
-    cur.execute("""
+    """, """
     CREATE TABLE IF NOT EXISTS cases(
         case_id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id TEXT,
@@ -84,79 +521,137 @@ def db_init():
         status TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
-    """)
-    conn.commit()
-    conn.close()
+    """),
+    # v2: per-user indexes for every hot query. Each index carries the rowid, so
+    # transactions(user_id) also serves the "rowid > watermark" delta scans and
+    # cases(user_id, case_id) the ORDER BY case_id DESC listing.
+    (
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id);",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_user_created ON alerts(user_id, created_at);",
+        "CREATE INDEX IF NOT EXISTS idx_cases_user_case ON cases(user_id, case_id);",
+    ),
+]
+SCHEMA_VERSION = len(SCHEMA_MIGRATIONS)
+
+def db_schema_version() -> int:
+    return POOL.connection().execute("PRAGMA user_version;").fetchone()[0]
+
+def db_migrate(target: int = SCHEMA_VERSION) -> int:
+    """Apply pending migrations up to `target`, each in its own transaction."""
+    version = db_schema_version()
+    while version < target:
+        with POOL.unit_of_work() as conn:
+            for stmt in SCHEMA_MIGRATIONS[version]:
+                conn.execute(stmt)
+            version += 1
+            conn.execute(f"PRAGMA user_version={version};")
+    return version
+
+def db_init():
+    db_migrate()
+
+def db_explain(sql: str, params: Tuple = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN details, e.g. to confirm a query uses an index rather than a scan."""
+    return [row[3] for row in POOL.connection().execute("EXPLAIN QUERY PLAN " + sql, params)]
 
 def db_insert_transactions(rows: List[Transaction]):
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.executemany("""
-    INSERT OR REPLACE INTO transactions(txn_id,user_id,amount,location_code,hour_of_day,device_new)
-    VALUES(?,?,?,?,?,?);
-    """, [(t.txn_id, t.user_id, t.amount, t.location_code, t.hour_of_day, t.device_new) for t in rows])
-    conn.commit()
-    conn.close()
+    with POOL.unit_of_work() as conn, METRICS.stage("db.insert_transactions", rows=len(rows)):
+        conn.executemany(SQL_INSERT_TRANSACTION, [
+            (t.txn_id, t.user_id, t.amount, t.location_code, t.hour_of_day, t.device_new) for t in rows
+        ])
 
 def db_insert_alert(alert: FraudAlert):
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.execute("""
-    INSERT INTO alerts(txn_id,user_id,reason,score) VALUES(?,?,?,?);
-    """, (alert.txn_id, alert.user_id, alert.reason, alert.score))
-    conn.commit()
-    conn.close()
+    with POOL.unit_of_work() as conn:
+        conn.execute(SQL_INSERT_ALERT, (alert.txn_id, alert.user_id, alert.reason, alert.score))
+        cache_invalidate((alert.user_id,), "latest_alert")
+
+def db_insert_alerts(alerts: List[FraudAlert]):
+    if not alerts:
+        return
+    with POOL.unit_of_work() as conn, METRICS.stage("db.insert_alerts", rows=len(alerts)):
+        conn.executemany(SQL_INSERT_ALERT, [(a.txn_id, a.user_id, a.reason, a.score) for a in alerts])
+        cache_invalidate({a.user_id for a in alerts}, "latest_alert")
 
 def db_create_case(user_id: str, description: str) -> int:
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.execute("""
-    INSERT INTO cases(user_id,description,status) VALUES(?,?,?);
-    """, (user_id, description, "open"))
-    conn.commit()
-    case_id = cur.lastrowid
-    conn.close()
-    return case_id
+    with POOL.unit_of_work() as conn:
+        cur = conn.execute(SQL_INSERT_CASE, (user_id, description, "open"))
+        cache_invalidate((user_id,), "cases", "case_status")
+        return cur.lastrowid
 
 def db_update_case_status(case_id: int, status: str) -> bool:
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.execute("UPDATE cases SET status=? WHERE case_id=?;", (status, case_id))
-    conn.commit()
-    updated = cur.rowcount > 0
-    conn.close()
-    return updated
+    with POOL.unit_of_work() as conn:
+        cur = conn.execute(SQL_UPDATE_CASE_STATUS, (status, case_id))
+        if cur.rowcount == 0:
+            return False
+        # Looked up after the UPDATE so the write lock is already held
+        user_id, = conn.execute(SQL_CASE_OWNER, (case_id,)).fetchone()
+        cache_invalidate((user_id,), "cases", "case_status")
+        return True
 
 def db_get_latest_alert(user_id: str) -> Dict[str, Any]:
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.execute("""
-    SELECT txn_id, reason, score, created_at FROM alerts
-    WHERE user_id = ?
-    ORDER BY created_at DESC
-    LIMIT 1;
-    """, (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    row = POOL.connection().execute(SQL_LATEST_ALERT, (user_id,)).fetchone()
     if not row:
         return {}
     return {"txn_id": row[0], "reason": row[1], "score": row[2], "created_at": row[3]}
 
 def db_list_cases(user_id: str) -> List[Case]:
-    conn = db_connect()
-    cur = conn.cursor()
-    cur.execute("""
-    SELECT case_id, user_id, description, status FROM cases
-    WHERE user_id = ?
-    ORDER BY case_id DESC;
-    """, (user_id,))
-    rows = cur.fetchall()
-    conn.close()
+    rows = POOL.connection().execute(SQL_LIST_CASES, (user_id,)).fetchall()
     return [Case(case_id=r[0], user_id=r[1], description=r[2], status=r[3]) for r in rows]
 
+def db_load_transactions(conn: sqlite3.Connection, user_id: str, since: Optional[int] = None) -> pd.DataFrame:
+    """A user's transactions, or only those with rowid > `since`."""
+    with METRICS.stage("db.load_transactions") as stage:
+        if since is None:
+            df = pd.read_sql_query(SQL_USER_TRANSACTIONS, conn, params=(user_id,))
+        else:
+            df = pd.read_sql_query(SQL_USER_TRANSACTIONS_SINCE, conn, params=(user_id, since))
+        stage.rows = len(df)
+    return df
+
+def db_load_features(conn: sqlite3.Connection, user_id: str, since: Optional[int] = None) -> TransactionFeatures:
+    """
+    A user's model features (optionally only rowid > `since`) fetched straight
+    into preallocated arrays, a chunk of cursor rows at a time. The extent and
+    the rows are read in one snapshot, so a concurrent INSERT OR REPLACE from
+    another connection cannot leave the arrays part-filled.
+    """
+    since = since or 0
+    with METRICS.stage("db.load_features") as stage, read_transaction(conn):
+        n, upto = conn.execute(SQL_USER_FEATURE_EXTENT, (user_id, since)).fetchone()
+        row_id = np.empty(n, dtype=np.int64)
+        X = np.empty((n, len(FEATURE_COLUMNS)), dtype=np.float32)
+        # Same snapshot as the COUNT, so the window holds exactly n rows
+        cur = conn.execute(SQL_USER_FEATURES, (user_id, since, upto or since))
+        i = 0
+        while True:
+            rows = cur.fetchmany(FEATURE_FETCH_ROWS)
+            if not rows:
+                break
+            block = np.fromiter(rows, dtype=FEATURE_ROW_DTYPE, count=len(rows))
+            row_id[i:i + len(rows)] = block["row_id"]
+            for j, name in enumerate(FEATURE_COLUMNS):
+                X[i:i + len(rows), j] = block[name]
+            i += len(rows)
+        stage.rows = n
+    return TransactionFeatures(user_id, row_id, X)
+
+def db_txn_ids(conn: sqlite3.Connection, row_ids: np.ndarray) -> List[Optional[str]]:
+    """txn_id for each rowid, in the order given; None for rows replaced since they were read."""
+    by_rowid: Dict[int, str] = {}
+    ids = row_ids.tolist()
+    for i in range(0, len(ids), TXN_ID_LOOKUP_BATCH):
+        chunk = ids[i:i + TXN_ID_LOOKUP_BATCH]
+        by_rowid.update(conn.execute(SQL_TXN_IDS.format(",".join("?" * len(chunk))), chunk))
+    return [by_rowid.get(r) for r in ids]
+
+def db_get_case_status(user_id: str, case_id: int) -> Optional[str]:
+    row = POOL.connection().execute(SQL_CASE_STATUS, (case_id, user_id)).fetchone()
+    return row[0] if row else None
+
 # -----------------------------
 # Simulation & detection
 # -----------------------------
+@METRICS.timed("simulate_transactions")
 def simulate_transactions(user_id: str, n: int = 40, anomaly_boost: int = 4) -> List[Transaction]:
     """
     Generate mostly normal behavior, with a few anomalies:
@@ -194,46 +689,398 @@ def simulate_transactions(user_id: str, n: int = 40, anomaly_boost: int = 4) ->
     rng.shuffle(rows)
     return rows
 
-def fit_isolation_forest(df: pd.DataFrame) -> Tuple[IsolationForest, pd.Series]:
+FEATURE_COLUMNS = ["amount", "location_code", "hour_of_day", "device_new"]
+
+def feature_matrix(data) -> np.ndarray:
+    """Model input from a DataFrame or TransactionFeatures; models are always fit on plain arrays."""
+    if isinstance(data, TransactionFeatures):
+        return data.X
+    return data[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+
+def fit_isolation_forest(data) -> Tuple[IsolationForest, pd.Series]:
     model = IsolationForest(
         contamination=CONTAMINATION,
         random_state=RANDOM_SEED,
         n_estimators=200,
         bootstrap=True
     )
-    features = df[["amount", "location_code", "hour_of_day", "device_new"]]
-    model.fit(features)
+    features = feature_matrix(data)
+    with METRICS.stage("model.fit", rows=len(data)):
+        model.fit(features)
     scores = model.score_samples(features)  # higher = more normal
-    preds = model.predict(features)         # 1 normal, -1 anomaly
-    return model, pd.Series(preds, index=df.index), pd.Series(scores, index=df.index)
+    # predict() would walk every tree again; it is just score_samples < offset_
+    preds = np.where(scores < model.offset_, -1, 1)  # 1 normal, -1 anomaly
+    index = getattr(data, "index", None)
+    return model, pd.Series(preds, index=index), pd.Series(scores, index=index)
 
-def explain_reason(row: pd.Series, df_stats: Dict[str, Tuple[float, float]]) -> str:
-    reasons = []
+# -----------------------------
+# Reason rules
+# -----------------------------
+# Each rule maps whole columns to a boolean mask. Masks are packed into one integer
+# code per row (bit i = rule i fired) and codes are turned into text once per distinct
+# code, so adding a rule never brings back per-row Python.
+DEFAULT_REASON = "behavior deviates from historical pattern"
+
+@dataclass
+class ReasonRule:
+    text: str
+    predicate: Callable[[Any, Dict[str, Tuple[float, float]]], np.ndarray]
+
+REASON_RULES: List[ReasonRule] = []
+
+def reason_rule(text: str):
+    """Decorator registering `fn(columns, df_stats) -> bool mask` as an explanation rule."""
+    def register(fn):
+        REASON_RULES.append(ReasonRule(text=text, predicate=fn))
+        return fn
+    return register
+
+@reason_rule("unusually high amount")
+def _rule_high_amount(cols, df_stats):
     amt_mean, amt_std = df_stats["amount"]
-    if row["amount"] > amt_mean + 3*amt_std:
-        reasons.append("unusually high amount")
-    if row["location_code"] >= 5:
-        reasons.append("unfamiliar location")
-    if row["hour_of_day"] in (0,1,2,3):
-        reasons.append("odd login/transaction hour")
-    if row["device_new"] == 1:
-        reasons.append("new device")
-    if not reasons:
-        reasons.append("behavior deviates from historical pattern")
-    return ", ".join(reasons)
+    return np.asarray(cols["amount"], dtype=float) > amt_mean + 3*amt_std
+
+@reason_rule("unfamiliar location")
+def _rule_far_location(cols, df_stats):
+    return np.asarray(cols["location_code"]) >= 5
+
+@reason_rule("odd login/transaction hour")
+def _rule_odd_hour(cols, df_stats):
+    return np.isin(np.asarray(cols["hour_of_day"]), (0, 1, 2, 3))
+
+@reason_rule("new device")
+def _rule_new_device(cols, df_stats):
+    return np.asarray(cols["device_new"]) == 1
+
+def reason_codes(cols, df_stats: Dict[str, Tuple[float, float]],
+                 rules: Optional[List[ReasonRule]] = None) -> np.ndarray:
+    """Bitmask of fired rules per row; `cols` is a DataFrame or a mapping of column arrays."""
+    rules = REASON_RULES if rules is None else rules
+    codes = None
+    for bit, rule in enumerate(rules):
+        fired = np.asarray(rule.predicate(cols, df_stats), dtype=np.int64) << bit
+        codes = fired if codes is None else codes | fired
+    if codes is None:
+        codes = np.zeros(len(cols[FEATURE_COLUMNS[0]]), dtype=np.int64)
+    return codes
+
+def reason_texts(codes: np.ndarray, rules: Optional[List[ReasonRule]] = None) -> np.ndarray:
+    """Lookup table from bitmask to reason string, built only for the codes present."""
+    rules = REASON_RULES if rules is None else rules
+    uniq, inverse = np.unique(codes, return_inverse=True)
+    table = np.empty(len(uniq), dtype=object)
+    for i, code in enumerate(uniq):
+        fired = [r.text for bit, r in enumerate(rules) if code >> bit & 1]
+        table[i] = ", ".join(fired) if fired else DEFAULT_REASON
+    return table[inverse]
+
+def explain_reasons(frame: pd.DataFrame, df_stats: Dict[str, Tuple[float, float]],
+                    rules: Optional[List[ReasonRule]] = None) -> pd.Series:
+    """Column-wise explain_reason(): one reason string per row of `frame`."""
+    codes = reason_codes(frame, df_stats, rules)
+    return pd.Series(reason_texts(codes, rules), index=frame.index, dtype=object)
+
+def explain_reason(row: pd.Series, df_stats: Dict[str, Tuple[float, float]]) -> str:
+    return explain_reasons(row.to_frame().T, df_stats).iloc[0]
+
+def amount_stats(cols) -> Dict[str, Tuple[float, float]]:
+    """Mean and sample std of amount; `cols` is a DataFrame or a mapping of column arrays."""
+    amount = np.asarray(cols["amount"], dtype=np.float64)
+    std = amount.std(ddof=1) if len(amount) > 1 else np.nan
+    return {"amount": (amount.mean(), std if std else 1.0)}
+
+def alerts_from_scores(df: pd.DataFrame, scores: np.ndarray, threshold: float,
+                       df_stats: Dict[str, Tuple[float, float]]) -> List[FraudAlert]:
+    """FraudAlerts for every row scoring below the model threshold (offset_)."""
+    with METRICS.stage("alerts.build") as stage:
+        flagged_mask = np.asarray(scores) < threshold
+        flagged = df.loc[flagged_mask]
+        reasons = explain_reasons(flagged, df_stats)
+        stage.rows = len(flagged)
+        return [
+            FraudAlert(user_id=user_id, txn_id=txn_id, reason=reason, score=float(score))
+            for user_id, txn_id, reason, score in zip(
+                flagged["user_id"], flagged["txn_id"], reasons, np.asarray(scores)[flagged_mask]
+            )
+        ]
+
+def alerts_from_features(conn: sqlite3.Connection, feats: TransactionFeatures, scores: np.ndarray,
+                         threshold: float, df_stats: Dict[str, Tuple[float, float]]) -> List[FraudAlert]:
+    """
+    alerts_from_scores() for columnar input; txn_ids are read back only for flagged
+    rows. A row replaced meanwhile is skipped: its new rowid is past the watermark.
+    """
+    with METRICS.stage("alerts.build") as stage:
+        flagged_mask = np.asarray(scores) < threshold
+        flagged = feats[flagged_mask]
+        reasons = reason_texts(reason_codes(flagged.columns, df_stats))
+        txn_ids = db_txn_ids(conn, flagged.row_id)
+        stage.rows = len(flagged)
+        return [
+            FraudAlert(user_id=feats.user_id, txn_id=txn_id, reason=reason, score=float(score))
+            for txn_id, reason, score in zip(txn_ids, reasons, np.asarray(scores)[flagged_mask])
+            if txn_id is not None
+        ]
+
+def score_frame(model: IsolationForest, data) -> np.ndarray:
+    """score_samples over a DataFrame or TransactionFeatures."""
+    with METRICS.stage("model.score_samples", rows=len(data)):
+        return model.score_samples(feature_matrix(data)) if len(data) else np.empty(0)
+
+# -----------------------------
+# Model store
+# -----------------------------
+MODEL_DIR = "models"          # relative paths resolve next to the database file
+REFIT_MIN_NEW_ROWS = 500      # never refit on fewer unseen rows than this
+REFIT_GROWTH_RATIO = 0.25     # refit once rows since the last fit exceed this share of the training set
+DRIFT_MIN_ROWS = 50           # smallest delta whose mean score is trusted for drift checks
+DRIFT_SCORE_DELTA = 0.05      # refit when the delta's mean score moves this far from training
+
+@dataclass
+class ModelMeta:
+    key: str
+    trained_through: int      # highest transactions.rowid used to fit the model
+    scored_through: int       # highest transactions.rowid already scored and alerted on
+    n_train: int
+    n_since_fit: int
+    score_mean: float
+    amount_mean: float
+    amount_std: float
+
+    @property
+    def df_stats(self) -> Dict[str, Tuple[float, float]]:
+        return {"amount": (self.amount_mean, self.amount_std)}
+
+def default_model_dir() -> str:
+    """MODEL_DIR, anchored at the configured database's directory rather than the cwd."""
+    return os.path.join(os.path.dirname(os.path.abspath(POOL.path)), MODEL_DIR)
+
+def model_key(user_id: str, segment: str = "default") -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{segment}__{user_id}")
+
+class ModelStore:
+    """
+    Fitted IsolationForests on disk, one per user/segment key:
+    `<key>@<trained_through>.pkl` holds the model and `<key>.json` its watermarks.
+    Advancing the scored watermark only rewrites the small JSON file.
+    """
+    def __init__(self, root: Optional[str] = None):
+        self.root = default_model_dir() if root is None else root
+        self._lock = threading.Lock()
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def _model_path(self, key: str, watermark: int) -> str:
+        return os.path.join(self.root, f"{key}@{watermark}.pkl")
+
+    def load_meta(self, key: str) -> Optional[ModelMeta]:
+        try:
+            with open(self._meta_path(key)) as f:
+                return ModelMeta(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta: ModelMeta):
+        tmp = self._meta_path(meta.key) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(asdict(meta), f)
+        os.replace(tmp, self._meta_path(meta.key))
+
+    def load(self, key: str) -> Optional[Tuple[IsolationForest, ModelMeta]]:
+        meta = self.load_meta(key)
+        if meta is None:
+            return None
+        return self.load_model(meta), meta
+
+    def load_model(self, meta: ModelMeta) -> IsolationForest:
+        with open(self._model_path(meta.key, meta.trained_through), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, model: IsolationForest, meta: ModelMeta):
+        self.write_model(model, meta)
+        self.publish(meta)
+
+    def write_model(self, model: IsolationForest, meta: ModelMeta):
+        """Write the model file only; it is not used until publish(meta)."""
+        os.makedirs(self.root, exist_ok=True)
+        path = self._model_path(meta.key, meta.trained_through)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    def publish(self, meta: ModelMeta):
+        """Point the key at meta's model and watermarks, dropping the superseded model file."""
+        with self._lock:
+            previous = self.load_meta(meta.key)
+            if previous is not None:
+                meta.scored_through = max(meta.scored_through, previous.scored_through)
+            self._write_meta(meta)
+        if previous is not None and previous.trained_through != meta.trained_through:
+            try:
+                os.remove(self._model_path(meta.key, previous.trained_through))
+            except FileNotFoundError:
+                pass
+
+    def advance(self, key: str, scored_through: int, n_new: int) -> Optional[ModelMeta]:
+        with self._lock:
+            meta = self.load_meta(key)
+            if meta is None or scored_through <= meta.scored_through:
+                return meta
+            meta.scored_through = scored_through
+            meta.n_since_fit += n_new
+            self._write_meta(meta)
+            return meta
+
+def build_model_meta(key: str, feats: TransactionFeatures, scores: np.ndarray, scored_through: int) -> ModelMeta:
+    (amt_mean, amt_std), = amount_stats(feats.columns).values()
+    return ModelMeta(
+        key=key,
+        trained_through=feats.max_row_id,
+        scored_through=scored_through,
+        n_train=len(feats),
+        n_since_fit=0,
+        score_mean=float(np.mean(scores)),
+        amount_mean=float(amt_mean),
+        amount_std=float(amt_std),
+    )
+
+def needs_refit(meta: ModelMeta, delta_scores: np.ndarray) -> bool:
+    if meta.n_since_fit >= max(REFIT_MIN_NEW_ROWS, REFIT_GROWTH_RATIO * meta.n_train):
+        return True
+    return (len(delta_scores) >= DRIFT_MIN_ROWS
+            and abs(float(np.mean(delta_scores)) - meta.score_mean) > DRIFT_SCORE_DELTA)
 
 # -----------------------------
 # NLP-ish intent detection
 # -----------------------------
+# Intents in priority order. An intent fires when a keyword of its first slot occurs
+# (case-insensitively, anywhere) and, if it has a second slot, a keyword of that slot
+# occurs later on the same line.
+INTENT_RULES: List[Tuple[str, Tuple[Tuple[str, ...], ...]]] = [
+    ("exit", (("exit", "quit", "bye"),)),
+    ("why_flagged", (("why", "reason"), ("flag", "alert", "blocked", "hold"))),
+    ("report_fraud", (("report", "raise", "submit"), ("fraud", "issue", "case", "complaint"))),
+    ("check_status", (("status", "track", "progress"), ("case", "ticket", "complaint", "id"))),
+    ("list_cases", (("my", "show", "list"), ("cases", "tickets", "complaints"))),
+    ("help", (("help", "what can you do", "?"),)),
+]
+HELP_WORDS = ("menu", "options")  # whole-message aliases for help
+
+# The equivalent one-regex-per-intent form (what the engine below replaces)
 INTENT_PATTERNS = {
-    "why_flagged": re.compile(r"(why|reason).*(flag|alert|blocked|hold)", re.I),
-    "report_fraud": re.compile(r"(report|raise|submit).*(fraud|issue|case|complaint)", re.I),
-    "check_status": re.compile(r"(status|track|progress).*(case|ticket|complaint|id)", re.I),
-    "list_cases": re.compile(r"(my|show|list).*(cases|tickets|complaints)", re.I),
-    "help": re.compile(r"(help|what can you do|\?)", re.I),
-    "exit": re.compile(r"(exit|quit|bye)", re.I),
+    name: re.compile(".*".join("(" + "|".join(map(re.escape, slot)) + ")" for slot in slots), re.I)
+    for name, slots in INTENT_RULES
 }
 
+@dataclass
+class IntentMatch:
+    intent: Optional[str]               # None when nothing matched
+    case_id: Optional[int] = None       # first "case [#] <n>" in the message
+    description: Optional[str] = None   # text after the first "report", for report_fraud
+
+REPORT_TAIL = re.compile(r":?\s*(.*)")
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex alternation shaped as a prefix trie; greedy, so it takes the longest word at a position."""
+    root: Dict[str, Any] = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(root)
+
+class IntentEngine:
+    """
+    Classifies a message in one left-to-right pass. Every keyword (as a prefix trie),
+    the case-ID slot and line breaks are fused into a single alternation; per-intent
+    state records the earliest end of a first-slot keyword on the current line, so a
+    second-slot keyword decides its intent in O(1). There is no `.*` to backtrack
+    over, so time stays linear in the message length.
+    """
+    def __init__(self, rules: List[Tuple[str, Tuple[Tuple[str, ...], ...]]] = INTENT_RULES):
+        self.names = [name for name, _ in rules]
+        self.two_slot = [len(slots) > 1 for _, slots in rules]
+        self._keywords = sorted({k.lower() for _, slots in rules for slot in slots for k in slot})
+        # The trie yields the longest keyword at a position; that hit also stands for
+        # every keyword that is a prefix of it ("cases" -> "case").
+        self._hits: Dict[str, List[Tuple[int, int, int]]] = {
+            kw: [(i, j, len(k)) for i, (_, slots) in enumerate(rules)
+                 for j, slot in enumerate(slots) for k in slot if kw.startswith(k.lower())]
+            for kw in self._keywords
+        }
+        self._scanner = re.compile(
+            r"(?P<case_id>case\s*(?:#\s*)?(?P<case_no>\d+))|(?P<nl>\n)|(?P<kw>"
+            + _trie_pattern(self._keywords) + ")",
+            re.I,
+        )
+
+    def _keyword_hits(self, matched: str) -> List[Tuple[int, int, int]]:
+        hits = self._hits.get(matched.lower())
+        if hits is None:
+            # Unicode case folding the IGNORECASE match allows but str.lower() does not mirror
+            kw = next(k for k in self._keywords if re.fullmatch(re.escape(k), matched, re.I))
+            hits = self._hits[kw]
+        return hits
+
+    def classify(self, text: str) -> IntentMatch:
+        n = len(self.names)
+        matched = [False] * n
+        first_end = [None] * n
+        case_id = None
+        report_end = None
+        search = self._scanner.search
+        m = search(text)
+        while m is not None:
+            group, pos = m.lastgroup, m.start()
+            if group == "nl":
+                first_end = [None] * n
+            else:
+                if group == "case_id":
+                    if case_id is None:
+                        case_id = int(m.group("case_no"))
+                    hits = self._hits.get("case", [])
+                else:
+                    word = m.group("kw")
+                    hits = self._keyword_hits(word)
+                    if report_end is None and word[:6].lower() == "report":
+                        report_end = pos + len("report")
+                for intent, slot, length in hits:
+                    if matched[intent]:
+                        continue
+                    if slot == 0:
+                        if not self.two_slot[intent]:
+                            matched[intent] = True
+                        elif first_end[intent] is None or pos + length < first_end[intent]:
+                            first_end[intent] = pos + length
+                    elif first_end[intent] is not None and first_end[intent] <= pos:
+                        matched[intent] = True
+            # Resume one character on, not at m.end(): keywords may overlap ("showhy")
+            m = search(text, pos + 1)
+
+        intent = next((name for name, hit in zip(self.names, matched) if hit), None)
+        if intent is None and text.lower() in HELP_WORDS:
+            intent = "help"
+        description = None
+        if intent == "report_fraud" and report_end is not None:
+            description = REPORT_TAIL.match(text, report_end).group(1).strip() or None
+        return IntentMatch(intent=intent, case_id=case_id, description=description)
+
+    def classify_many(self, texts: Iterable[str]) -> List[IntentMatch]:
+        classify = self.classify
+        return [classify(text) for text in texts]
+
+INTENT_ENGINE = IntentEngine()
+
 HELP_TEXT = (
     "I can help with:\n"
     "• Why was my account flagged?\n"
@@ -247,55 +1094,147 @@ HELP_TEXT = (
 # Chatbot core
 # -----------------------------
 class SmartFraudSystem:
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, segment: str = "default", store: Optional[ModelStore] = None,
+                 cache: Optional[LookupCache] = None):
         self.user_id = user_id
+        self.key = model_key(user_id, segment)
+        self.store = store if store is not None else ModelStore()
+        self.cache = cache if cache is not None else LOOKUP_CACHE
         self.model = None
+        self.meta: Optional[ModelMeta] = None
+        self._model_lock = threading.Lock()
+        self._refit_thread: Optional[threading.Thread] = None
 
     def ingest_and_detect(self):
-        # Simulate and store transactions
-        txns = simulate_transactions(self.user_id)
-        db_insert_transactions(txns)
-
-        # Build dataframe from DB for detection
-        conn = db_connect()
-        df = pd.read_sql_query(
-            "SELECT txn_id, user_id, amount, location_code, hour_of_day, device_new FROM transactions WHERE user_id = ?;",
-            conn, params=(self.user_id,)
-        )
-        conn.close()
+        """Store new (simulated) transactions, then detect()."""
+        db_insert_transactions(simulate_transactions(self.user_id))
+        return self.detect()
 
-        # Fit model & detect
-        self.model, preds, scores = fit_isolation_forest(df)
+    def detect(self):
+        """
+        Alert on the stored transactions no model has scored yet. The first run
+        fits and persists a model over the whole history; later runs reload it
+        and only score rows past its watermark.
+        """
+        model, meta = self._load_model()
+        # Fit and score with no write transaction open, so other writers are not
+        # blocked meanwhile. Rows stay past the watermark until the alerts commit,
+        # so a crash in between only means they are scored again next run.
+        conn = POOL.connection()
+        if model is None:
+            feats, scores, model, meta = self._fit_history(conn)
+            finish = lambda: self._install(model, meta)
+        else:
+            feats = db_load_features(conn, self.user_id, since=meta.scored_through)
+            scores = score_frame(model, feats)
+            through = feats.max_row_id
+            finish = lambda: self._record_scored(through, scores)
 
-        # Stats for simple rule explanations
-        df_stats = {
-            "amount": (df["amount"].mean(), df["amount"].std() if df["amount"].std() else 1.0),
-        }
+        anomalies = alerts_from_features(conn, feats, scores, model.offset_, meta.df_stats)
+        db_insert_alerts(anomalies)
+
+        # Watermarks move only after the alerts are committed
+        finish()
+        return feats, anomalies
+
+    def score_batch(self, conn: sqlite3.Connection, rows: pd.DataFrame,
+                    scored_through: int) -> Tuple[List[FraudAlert], Callable[[], None]]:
+        """
+        Score rows the caller has just inserted (inside its open unit of work)
+        against the user's existing model; see has_model() and cold_start().
+        Returns the alerts plus a callback that advances the watermark and must
+        run after the caller commits.
+        """
+        model, meta = self._load_model()
+        scores = score_frame(model, rows)
+        alerts = alerts_from_scores(rows, scores, model.offset_, meta.df_stats)
+        return alerts, lambda: self._record_scored(scored_through, scores)
+
+    def has_model(self) -> bool:
+        return self._load_model()[0] is not None
 
-        anomalies = []
-        for idx, pred in preds.items():
-            if pred == -1:
-                row = df.loc[idx]
-                reason = explain_reason(row, df_stats)
-                alert = FraudAlert(
-                    user_id=row["user_id"],
-                    txn_id=row["txn_id"],
-                    reason=reason,
-                    score=float(scores.loc[idx])
-                )
-                db_insert_alert(alert)
-                anomalies.append(alert)
-        return df, anomalies
+    def cold_start(self, conn: sqlite3.Connection) -> Tuple[List[FraudAlert], Callable[[], None]]:
+        """
+        Fit a first model over the user's whole history and alert on all of it.
+        Call with no write transaction open: fitting is slow and would block every
+        other writer. The callback installs the model and must run after the
+        caller commits the alerts.
+        """
+        feats, scores, model, meta = self._fit_history(conn)
+        alerts = alerts_from_features(conn, feats, scores, model.offset_, meta.df_stats)
+        return alerts, lambda: self._install(model, meta)
+
+    def _load_model(self) -> Tuple[Optional[IsolationForest], Optional[ModelMeta]]:
+        with self._model_lock:
+            if self.model is None:
+                loaded = self.store.load(self.key)
+                if loaded is not None:
+                    self.model, self.meta = loaded
+            return self.model, self.meta
+
+    def _fit_history(self, conn: sqlite3.Connection):
+        # Cold start: fit over the full history and alert on all of it
+        feats = db_load_features(conn, self.user_id)
+        model, _, scores = fit_isolation_forest(feats)
+        scores = scores.to_numpy()
+        meta = build_model_meta(self.key, feats, scores, scored_through=feats.max_row_id)
+        return feats, scores, model, meta
+
+    def _install(self, model: IsolationForest, meta: ModelMeta):
+        self.store.save(model, meta)
+        with self._model_lock:
+            self.model, self.meta = model, meta
+
+    def _record_scored(self, scored_through: int, scores: np.ndarray):
+        if not len(scores):
+            return
+        meta = self.store.advance(self.key, scored_through, len(scores)) or self.meta
+        with self._model_lock:
+            if self.meta is not None and self.meta.trained_through == meta.trained_through:
+                self.meta = meta
+        if needs_refit(meta, scores):
+            self.schedule_refit()
+
+    def schedule_refit(self):
+        """Refit on the full history in a background thread; the old model serves until it finishes."""
+        if self._refit_thread is not None and self._refit_thread.is_alive():
+            return
+        self._refit_thread = threading.Thread(target=self._refit, name=f"refit-{self.key}", daemon=True)
+        self._refit_thread.start()
+
+    def wait_for_refit(self, timeout: Optional[float] = None):
+        if self._refit_thread is not None:
+            self._refit_thread.join(timeout)
+
+    def _refit(self):
+        try:
+            feats = db_load_features(POOL.connection(), self.user_id)
+        finally:
+            POOL.release()   # each refit runs on a new thread; don't leak its connection
+        model, _, scores = fit_isolation_forest(feats)
+        meta = build_model_meta(self.key, feats, scores.to_numpy(), scored_through=self.meta.scored_through)
+        self.store.save(model, meta)
+        with self._model_lock:
+            self.model, self.meta = model, meta
 
     # ---- Chatbot responses ----
     def handle_input(self, text: str) -> str:
         text = text.strip()
+        with METRICS.stage("chat.classify"):
+            match = INTENT_ENGINE.classify(text)
+        # One chat turn = one pooled connection and at most one commit.
+        with POOL.unit_of_work(), METRICS.stage(f"chat.{match.intent or 'fallback'}"):
+            return self._respond(match)
+
+    def _respond(self, match: IntentMatch) -> str:
+        intent = match.intent
 
-        if INTENT_PATTERNS["exit"].search(text):
+        if intent == "exit":
             return "__EXIT__"
 
-        if INTENT_PATTERNS["why_flagged"].search(text):
-            latest = db_get_latest_alert(self.user_id)
+        if intent == "why_flagged":
+            latest = self.cache.get_or_load(self.user_id, "latest_alert", None,
+                                            lambda: db_get_latest_alert(self.user_id))
             if not latest:
                 return "You're all clear. I don't see any recent alerts on your account."
             return (
@@ -304,36 +1243,30 @@ class SmartFraudSystem:
                 f"Would you like to report this as fraud? If yes, say: report fraud <short description>."
             )
 
-        if INTENT_PATTERNS["report_fraud"].search(text):
-            # extract description
-            m = re.search(r"report.*?:?\s*(.*)", text, re.I)
-            desc = m.group(1).strip() if m and m.group(1) else "Suspected unauthorized activity."
+        if intent == "report_fraud":
+            desc = match.description or "Suspected unauthorized activity."
             case_id = db_create_case(self.user_id, desc)
             return f"Your fraud case has been submitted. Case ID: {case_id}. We'll keep you posted."
 
-        if INTENT_PATTERNS["check_status"].search(text):
-            # try to find a case id
-            m = re.search(r"(case\s*#?\s*)(\d+)", text, re.I)
-            if not m:
+        if intent == "check_status":
+            if match.case_id is None:
                 return "Please specify a case ID, e.g., 'status of case 3'."
-            case_id = int(m.group(2))
-            conn = db_connect()
-            cur = conn.cursor()
-            cur.execute("SELECT status FROM cases WHERE case_id=? AND user_id=?;", (case_id, self.user_id))
-            row = cur.fetchone()
-            conn.close()
-            if not row:
+            case_id = match.case_id
+            status = self.cache.get_or_load(self.user_id, "case_status", case_id,
+                                            lambda: db_get_case_status(self.user_id, case_id))
+            if status is None:
                 return f"I couldn't find case {case_id} for your account."
-            return f"Case {case_id} status: {row[0]}."
+            return f"Case {case_id} status: {status}."
 
-        if INTENT_PATTERNS["list_cases"].search(text):
-            cases = db_list_cases(self.user_id)
+        if intent == "list_cases":
+            cases = self.cache.get_or_load(self.user_id, "cases", None,
+                                           lambda: db_list_cases(self.user_id))
             if not cases:
                 return "You have no cases yet."
             lines = [f"Case {c.case_id}: {c.description} [{c.status}]" for c in cases]
             return "Your cases:\n" + "\n".join(lines)
 
-        if INTENT_PATTERNS["help"].search(text) or text.lower() in ("menu", "options"):
+        if intent == "help":
             return HELP_TEXT
 
         # Default fallback
@@ -342,16 +1275,365 @@ class SmartFraudSystem:
             "Try: 'why was I flagged?', 'report fraud <details>', 'list my cases', or 'status of case 2'."
         )
 
+class UserSystems:
+    """LRU of per-user SmartFraudSystems (and their loaded models) sharing one ModelStore."""
+    def __init__(self, store: Optional[ModelStore] = None, max_users: int = MAX_WARM_USERS):
+        self.store = store if store is not None else ModelStore()
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._systems: "OrderedDict[str, SmartFraudSystem]" = OrderedDict()
+
+    def get(self, user_id: str) -> SmartFraudSystem:
+        with self._lock:
+            system = self._systems.pop(user_id, None)
+            if system is None:
+                system = SmartFraudSystem(user_id=user_id, store=self.store)
+                if len(self._systems) >= self.max_users:
+                    self._systems.popitem(last=False)
+            self._systems[user_id] = system
+            return system
+
+    def values(self) -> List[SmartFraudSystem]:
+        with self._lock:
+            return list(self._systems.values())
+
+# -----------------------------
+# Streaming ingestion
+# -----------------------------
+STREAM_BATCH_SIZE = 500
+
+def follow_lines(path: str, poll_interval: float = 0.5, from_start: bool = True) -> Iterator[Optional[str]]:
+    """Yield lines appended to `path` forever (tail -f); yields None while idle so batches can flush."""
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        pending = ""
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                yield None
+                time.sleep(poll_interval)
+                continue
+            pending += chunk
+            if pending.endswith("\n"):
+                yield pending
+                pending = ""
+
+def parse_transactions(lines: Iterable[Optional[str]], fmt: str = "jsonl") -> Iterator[Optional[Transaction]]:
+    """Decode JSONL or CSV (with header) lines into Transactions; idle markers (None) pass through."""
+    header: Optional[List[str]] = None
+    for line in lines:
+        if line is None:
+            yield None
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = values
+                continue
+            rec = dict(zip(header, values))
+        else:
+            rec = json.loads(line)
+        yield Transaction(
+            user_id=str(rec["user_id"]),
+            amount=float(rec["amount"]),
+            location_code=int(rec["location_code"]),
+            hour_of_day=int(rec["hour_of_day"]),
+            device_new=int(rec["device_new"]),
+            txn_id=rec.get("txn_id") or f"TXN-{uuid.uuid4().hex}",
+        )
+
+def micro_batches(records: Iterable[Optional[Transaction]], batch_size: int) -> Iterator[List[Transaction]]:
+    batch: List[Transaction] = []
+    for rec in records:
+        if rec is not None:
+            batch.append(rec)
+        if batch and (rec is None or len(batch) >= batch_size):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class StreamDetector:
+    """
+    Scores an unbounded stream of Transactions (any mix of users) in micro-batches:
+    each batch is bulk-inserted, scored against the users' current models and its
+    alerts persisted in one unit of work. Users seen for the first time are fitted
+    after that commit, with no write lock held, and their alerts written in a short
+    unit of work of their own. Memory is bounded by the batch size and the number
+    of users kept warm.
+    """
+    def __init__(self, store: Optional[ModelStore] = None, batch_size: int = STREAM_BATCH_SIZE,
+                 max_users: int = MAX_WARM_USERS):
+        self.batch_size = batch_size
+        self.systems = UserSystems(store=store, max_users=max_users)
+
+    def process_batch(self, batch: List[Transaction]) -> List[FraudAlert]:
+        alerts: List[FraudAlert] = []
+        finishers = []
+        cold: List[SmartFraudSystem] = []
+        with POOL.unit_of_work() as conn:
+            db_insert_transactions(batch)
+            # Rowids are assigned under our write lock, so every row of this batch is <= max(rowid)
+            scored_through = conn.execute("SELECT MAX(rowid) FROM transactions;").fetchone()[0]
+            frame = pd.DataFrame([asdict(t) for t in batch])
+            for user_id, rows in frame.groupby("user_id", sort=False):
+                system = self.systems.get(user_id)
+                if not system.has_model():
+                    cold.append(system)
+                    continue
+                user_alerts, finish = system.score_batch(conn, rows, scored_through)
+                alerts.extend(user_alerts)
+                finishers.append(finish)
+            db_insert_alerts(alerts)
+        for finish in finishers:
+            finish()
+        # The batch is committed, so a cold fit sees it. Until its alerts commit the
+        # user has no installed model, and a failure just means refitting next time.
+        conn = POOL.connection()
+        for system in cold:
+            user_alerts, finish = system.cold_start(conn)
+            db_insert_alerts(user_alerts)
+            finish()
+            alerts.extend(user_alerts)
+        return alerts
+
+    def run(self, records: Iterable[Optional[Transaction]]) -> Iterator[FraudAlert]:
+        for batch in micro_batches(records, self.batch_size):
+            yield from self.process_batch(batch)
+
+    def close(self):
+        """Let in-flight background refits finish so their models reach the store."""
+        for system in self.systems.values():
+            system.wait_for_refit()
+
+# -----------------------------
+# Async chat server
+# -----------------------------
+# Line protocol over TCP: the first line a client sends is its user ID, every later
+# line is one chat message. Each reply is one JSON line {"reply": ..., "exit": bool}.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_DB_THREADS = 8   # bounded pool running handle_input(); the event loop never touches SQLite
+
+class ChatServer:
+    def __init__(self, db_threads: int = SERVER_DB_THREADS, max_users: int = MAX_WARM_USERS):
+        self.executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="fraud-db")
+        self.systems = UserSystems(max_users=max_users)
+        self.sessions = 0
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        self.sessions += 1
+        try:
+            user_id = (await reader.readline()).decode().strip()
+            if not user_id:
+                return
+            system = self.systems.get(user_id)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode().strip()
+                if not text:
+                    continue
+                reply = await loop.run_in_executor(self.executor, system.handle_input, text)
+                done = reply == "__EXIT__"
+                payload = {"reply": "Goodbye." if done else reply, "exit": done}
+                writer.write(json.dumps(payload).encode() + b"\n")
+                await writer.drain()
+                if done:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host: str = SERVER_HOST, port: int = SERVER_PORT):
+        server = await asyncio.start_server(self.handle_client, host, port, backlog=4096)
+        addrs = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving fraud chatbot on {addrs}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+
+# -----------------------------
+# Batch detection across users
+# -----------------------------
+BATCH_SHARD_SIZE = 16   # users per task handed to a worker process
+
+@dataclass
+class UserDetection:
+    user_id: str
+    n_scored: int
+    seconds: float
+    alerts: List[FraudAlert]
+    publish: Optional[ModelMeta] = None   # model written by the worker, published after the alerts commit
+    scored_through: int = 0               # otherwise: advance the stored watermark to here
+
+_WORKER_CONN: Optional[sqlite3.Connection] = None
+_WORKER_STORE: Optional[ModelStore] = None
+
+def _batch_worker_init(db_path: str, store_root: str):
+    global _WORKER_CONN, _WORKER_STORE
+    # Workers only read; the parent process is the single writer.
+    _WORKER_CONN = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    _WORKER_STORE = ModelStore(store_root)
+
+def _detect_shard(user_ids: List[str], segment: str) -> List[UserDetection]:
+    return [detect_user(_WORKER_CONN, _WORKER_STORE, user_id, segment) for user_id in user_ids]
+
+def detect_user(conn: sqlite3.Connection, store: ModelStore, user_id: str,
+                segment: str = "default") -> UserDetection:
+    """
+    Score one user's unseen transactions without writing to the database.
+    A nightly run refits in place (no background thread) when needs_refit() says so.
+    """
+    t0 = time.perf_counter()
+    key = model_key(user_id, segment)
+    meta = store.load_meta(key)
+    publish = None
+    if meta is None:
+        feats = db_load_features(conn, user_id)
+        if not len(feats):
+            return UserDetection(user_id, 0, time.perf_counter() - t0, [])
+        model, _, scores = fit_isolation_forest(feats)
+        scores = scores.to_numpy()
+        meta = publish = build_model_meta(key, feats, scores, scored_through=feats.max_row_id)
+        store.write_model(model, meta)
+    else:
+        model = store.load_model(meta)
+        feats = db_load_features(conn, user_id, since=meta.scored_through)
+        if not len(feats):
+            return UserDetection(user_id, 0, time.perf_counter() - t0, [])
+        scores = score_frame(model, feats)
+    scored_through = feats.max_row_id
+    alerts = alerts_from_features(conn, feats, scores, model.offset_, meta.df_stats)
+
+    if publish is None:
+        meta.n_since_fit += len(feats)
+        if needs_refit(meta, scores):
+            full = db_load_features(conn, user_id)
+            model, _, full_scores = fit_isolation_forest(full)
+            publish = build_model_meta(key, full, full_scores.to_numpy(), scored_through=scored_through)
+            store.write_model(model, publish)
+    return UserDetection(user_id, len(feats), time.perf_counter() - t0, alerts,
+                         publish=publish, scored_through=scored_through)
+
+def db_list_users() -> List[str]:
+    return [r[0] for r in POOL.connection().execute("SELECT DISTINCT user_id FROM transactions;")]
+
+def detect_users(user_ids: List[str], workers: Optional[int] = None, store: Optional[ModelStore] = None,
+                 segment: str = "default", shard_size: int = BATCH_SHARD_SIZE) -> List[UserDetection]:
+    """
+    Shard users across a process pool. Each worker fits/scores with its own
+    read-only connection; alerts come back here and are bulk-inserted by this
+    process, one unit of work per shard, before any watermark moves.
+    """
+    store = store if store is not None else ModelStore()
+    shards = [user_ids[i:i + shard_size] for i in range(0, len(user_ids), shard_size)]
+    results: List[UserDetection] = []
+    # spawn: forked children must not inherit the parent's open SQLite handles
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_batch_worker_init, initargs=(POOL.path, store.root)) as pool:
+        futures = [pool.submit(_detect_shard, shard, segment) for shard in shards]
+        for fut in as_completed(futures):
+            shard_results = fut.result()
+            db_insert_alerts([a for r in shard_results for a in r.alerts])
+            for r in shard_results:
+                if r.publish is not None:
+                    store.publish(r.publish)
+                elif r.n_scored:
+                    store.advance(model_key(r.user_id, segment), r.scored_through, r.n_scored)
+            results.extend(shard_results)
+    return results
+
+def run_batch_detect(user_ids: List[str], workers: Optional[int]):
+    user_ids = user_ids or db_list_users()
+    t0 = time.perf_counter()
+    results = detect_users(user_ids, workers=workers)
+    elapsed = time.perf_counter() - t0
+    print(f"{'user':<24}{'scored':>10}{'alerts':>10}{'seconds':>10}")
+    for r in sorted(results, key=lambda r: r.seconds, reverse=True):
+        print(f"{r.user_id:<24}{r.n_scored:>10}{len(r.alerts):>10}{r.seconds:>10.3f}")
+    n_scored = sum(r.n_scored for r in results)
+    print(f"\n{len(results)} users, {n_scored} transactions, "
+          f"{sum(len(r.alerts) for r in results)} alerts in {elapsed:.2f}s "
+          f"({n_scored / elapsed if elapsed else 0:,.0f} txns/s)")
+
 # -----------------------------
 # CLI application
 # -----------------------------
-def main():
+def run_stream(source: str, fmt: str = "jsonl", follow: bool = False, batch_size: int = STREAM_BATCH_SIZE):
+    detector = StreamDetector(batch_size=batch_size)
+    if source == "-":
+        source_cm = nullcontext(sys.stdin)
+    elif follow:
+        source_cm = closing(follow_lines(source))
+    else:
+        source_cm = open(source)
+    with source_cm as lines:
+        try:
+            for alert in detector.run(parse_transactions(lines, fmt)):
+                print(f"ALERT {alert.user_id} {alert.txn_id}: {alert.reason} (score {alert.score:.3f})", flush=True)
+        finally:
+            detector.close()
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Smart Fraud Alert Chatbot")
+    ap.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    ap.add_argument("--serve", action="store_true", help="host many chat sessions over TCP instead of the CLI")
+    ap.add_argument("--host", default=SERVER_HOST)
+    ap.add_argument("--port", type=int, default=SERVER_PORT)
+    ap.add_argument("--db-threads", type=int, default=SERVER_DB_THREADS)
+    ap.add_argument("--stream", metavar="PATH",
+                    help="score a JSONL/CSV transaction stream ('-' for stdin) instead of chatting")
+    ap.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    ap.add_argument("--follow", action="store_true", help="keep reading as the stream file grows")
+    ap.add_argument("--batch-size", type=int, default=STREAM_BATCH_SIZE)
+    ap.add_argument("--detect-users", nargs="*", metavar="USER_ID",
+                    help="run batch detection for these users (all users when none given) and exit")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes for --detect-users")
+    args = ap.parse_args(argv)
+    if args.db != DB_PATH:
+        db_configure(args.db)
+
+    if args.serve:
+        db_init()
+        try:
+            asyncio.run(ChatServer(db_threads=args.db_threads).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        POOL.close_all()
+        return
+
+    if args.detect_users is not None:
+        db_init()
+        run_batch_detect(args.detect_users, args.workers)
+        POOL.close_all()
+        return
+
+    if args.stream:
+        db_init()
+        try:
+            run_stream(args.stream, args.format, args.follow, args.batch_size)
+        except KeyboardInterrupt:
+            pass
+        POOL.close_all()
+        return
+
     print("="*62)
     print(" Smart Fraud Alert Chatbot (NLP) — Single File Prototype ")
     print("="*62)
 
     # Fresh DB for demo runs (optional). Comment out if you want persistence.
-    if not os.path.exists(DB_PATH):
+    if not os.path.exists(POOL.path):
         db_init()
 
     # Create/ensure tables exist
@@ -361,9 +1643,9 @@ def main():
     user_id = "user_1001"
 
     system = SmartFraudSystem(user_id=user_id)
-    df, anomalies = system.ingest_and_detect()
+    scored, anomalies = system.ingest_and_detect()
 
-    print(f"\nLoaded {len(df)} transactions for {user_id}.")
+    print(f"\nScored {len(scored)} new transactions for {user_id}.")
     if anomalies:
         print(f"Detected {len(anomalies)} suspicious activities. Latest reasons:")
         for a in anomalies[:3]:
@@ -389,5 +1671,12 @@ def main():
             break
         print(f"Bot: {reply}")
 
+    POOL.close_all()
+
 if __name__ == "__main__":
-    main()
+    profile_path = os.environ.get(CPROFILE_ENV)
+    if profile_path:
+        cProfile.run("main()", profile_path)
+        print(f"cProfile stats written to {profile_path}", file=sys.stderr)
+    else:
+        main()